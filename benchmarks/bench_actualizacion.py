@@ -0,0 +1,221 @@
+"""Actualizaciones del almacén de hojas contra un servidor HTTP local.
+
+Sirve libros sintéticos (con ETag y respuestas 304) y recorre los casos
+que ve la interfaz: hoja sin cambios, filas anexadas al final (también
+con celdas vacías o conceptos solo numéricos), una fila modificada, un
+reinicio del servidor con instantáneas en disco seguido de filas nuevas,
+la primera carga por partes (también interrumpida por quien la espera) y varias hojas combinadas en un libro (también
+una pestaña nueva junto a otra restaurada de disco). En cada caso comprueba
+que el resultado del almacén sea el mismo que preparar los CSV completos
+con `preparar_hoja` (y `combinar_hojas`), y mide cuánto tarda. Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.bench_actualizacion --filas 100000
+"""
+import argparse
+import hashlib
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.sintetico import generar_csv
+from finanzas.categorias import cargar_reglas
+from finanzas.fuentes import COMPLETA, INCREMENTAL, SIN_CAMBIOS, AlmacenHojas
+from finanzas.ingesta import combinar_hojas, leer_csv, preparar_hoja
+
+# Filas que se anexan: una normal, una sin Ingreso /Egreso, una con concepto
+# numérico, una sin concepto y una con fecha inválida
+FILAS_NUEVAS = (
+    b'05/05/2026,"-99,5",Egreso,Caf\xc3\xa9 nuevo\n'
+    b"06/05/2026,120,,Transferencia\n"
+    b"07/05/2026,-35,Egreso,123\n"
+    b"08/05/2026,-10,Egreso,\n"
+    b"sin fecha,1,Egreso,Oxxo\n"
+)
+
+
+class Interrupcion(BaseException):
+    """Como las excepciones con que Streamlit interrumpe una ejecución (no derivan de Exception)"""
+
+
+def servidor_hojas(hojas, puerto=0):
+    """Servidor en segundo plano que sirve `hojas[ruta]` (bytes) en `<ruta>/export` con ETag; se pueden cambiar en caliente"""
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            contenido = hojas.get(self.path.split("/export")[0])
+            if contenido is None:
+                self.send_error(404)
+                return
+            etag = f'"{hashlib.sha1(contenido).hexdigest()}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            self.send_header("Content-Length", str(len(contenido)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(contenido)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("localhost", puerto), Manejador)
+    servidor.hojas = hojas
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def diferencias(hoja, esperada):
+    """Qué no coincide entre `hoja` y la `esperada` (lista vacía si nada)"""
+    errores = []
+    if not (hoja.df.dtypes == esperada.df.dtypes).all():
+        errores.append("tipos de columna")
+    # Las categorías pueden quedar en otro orden al anexar: se comparan los valores
+    if not (hoja.df.index.equals(esperada.df.index) and hoja.df.astype(object).equals(esperada.df.astype(object))):
+        errores.append("movimientos")
+    if not hoja.fechas_invalidas.index.equals(esperada.fechas_invalidas.index):
+        errores.append("fechas inválidas")
+    if hoja.reporte_fechas != esperada.reporte_fechas or hoja.filas_crudas != esperada.filas_crudas:
+        errores.append("reporte de fechas")
+    return errores
+
+
+class Verificacion:
+    """Casos contra el servidor local: cada uno comprueba el resultado y su tiempo"""
+
+    def __init__(self, servidor, filas):
+        self.servidor = servidor
+        self.hojas = servidor.hojas
+        self.filas = filas
+        self.reglas = cargar_reglas()
+        self.resultados = []
+
+    def link(self, ruta):
+        return f"http://localhost:{self.servidor.server_address[1]}{ruta}/export?format=csv&gid=0"
+
+    def completa(self, *rutas):
+        """Las hojas servidas en `rutas` preparadas de una vez (combinadas si son varias)"""
+        hojas = [preparar_hoja(leer_csv(self.hojas[ruta]), self.reglas) for ruta in rutas]
+        return hojas[0] if len(rutas) == 1 else combinar_hojas(hojas, rutas)
+
+    def comprobar(self, caso, funcion, esperado=None):
+        """Corre `funcion() -> (hoja, resultado, rutas)` y la compara con las hojas servidas en `rutas`"""
+        inicio = time.perf_counter()
+        try:
+            hoja, resultado, rutas = funcion()
+        except Exception as e:
+            self.resultados.append((caso, time.perf_counter() - inicio, [f"{type(e).__name__}: {e}"]))
+            return
+        segundos = time.perf_counter() - inicio
+        errores = diferencias(hoja, self.completa(*rutas))
+        if esperado is not None and resultado != esperado:
+            errores.append(f"resultado {resultado} (se esperaba {esperado})")
+        self.resultados.append((caso, segundos, errores))
+
+    def actualizacion(self, almacen, ruta):
+        estado, resultado, _ = almacen.actualizar(self.link(ruta), self.reglas)
+        return estado.hoja, resultado, [ruta]
+
+    def libro(self, almacen, rutas):
+        """Las hojas del almacén combinadas en un libro, como en la interfaz con varios enlaces"""
+        estados = almacen.obtener_varias([self.link(ruta) for ruta in rutas], self.reglas)
+        return combinar_hojas([estado.hoja for estado in estados], rutas), None, rutas
+
+    def pestaña_nueva(self, directorio, restaurada, nueva):
+        """Combina una hoja restaurada de disco tras un reinicio con otra que se descarga por primera vez"""
+        AlmacenHojas(directorio_instantaneas=directorio).obtener(self.link(restaurada), self.reglas)
+        return self.libro(AlmacenHojas(directorio_instantaneas=directorio), [restaurada, nueva])
+
+    def reinicio(self, directorio, ruta, contenido_nuevo):
+        """Carga la hoja, la restaura en un almacén nuevo (el servidor reiniciado) y la revalida con `contenido_nuevo`"""
+        AlmacenHojas(directorio_instantaneas=directorio).obtener(self.link(ruta), self.reglas)
+        reiniciado = AlmacenHojas(directorio_instantaneas=directorio)
+        self.hojas[ruta] = contenido_nuevo
+        # Lo restaurado nace vencido: obtener inicia la revalidación y actualizar la espera
+        reiniciado.obtener(self.link(ruta), self.reglas)
+        return self.actualizacion(reiniciado, ruta)
+
+    def carga_interrumpida(self, ruta):
+        """Carga por partes cuyo `avance` se interrumpe; otra sesión espera la misma carga"""
+        almacen = AlmacenHojas()
+
+        def interrumpir(parte):
+            raise Interrupcion()
+
+        try:
+            almacen.cargar_por_partes(self.link(ruta), self.reglas, interrumpir, 1)
+        except Interrupcion:
+            pass
+        return almacen.obtener(self.link(ruta), self.reglas).hoja, None, [ruta]
+
+    def casos(self, directorio):
+        base = generar_csv(self.filas)
+        self.hojas["/libro"] = base
+        almacen = AlmacenHojas()
+        self.comprobar("carga completa", lambda: (almacen.obtener(self.link("/libro"), self.reglas).hoja, None, ["/libro"]))
+        self.comprobar("sin cambios (304)", lambda: self.actualizacion(almacen, "/libro"), SIN_CAMBIOS)
+
+        self.hojas["/libro"] = base + FILAS_NUEVAS
+        self.comprobar("filas anexadas", lambda: self.actualizacion(almacen, "/libro"), INCREMENTAL)
+        self.hojas["/libro"] += FILAS_NUEVAS
+        self.comprobar("filas anexadas otra vez", lambda: self.actualizacion(almacen, "/libro"), INCREMENTAL)
+        self.hojas["/libro"] = self.hojas["/libro"].replace(b"Oxxo", b"OXXO", 1)
+        self.comprobar("fila modificada", lambda: self.actualizacion(almacen, "/libro"), COMPLETA)
+
+        self.hojas["/reinicio"] = base
+        self.comprobar(
+            "reinicio y filas anexadas",
+            lambda: self.reinicio(directorio, "/reinicio", base + FILAS_NUEVAS),
+            INCREMENTAL,
+        )
+
+        # Carga por partes: partes de una fila hacen que cada tipo se infiera por separado
+        self.hojas["/partes"] = base[:base.index(b"\n", 2000) + 1] + FILAS_NUEVAS
+        self.comprobar(
+            "carga por partes",
+            lambda: (AlmacenHojas().cargar_por_partes(self.link("/partes"), self.reglas, lambda parte: None, 1).hoja, None, ["/partes"]),
+        )
+        self.comprobar("carga por partes interrumpida", lambda: self.carga_interrumpida("/partes"))
+
+        # Varias hojas (pestañas o libros) combinadas; una de ellas recibe filas
+        pestañas = ["/enero", "/febrero", "/marzo"]
+        for semilla, ruta in enumerate(pestañas, start=1):
+            self.hojas[ruta] = generar_csv(self.filas // len(pestañas), semilla)
+        almacen = AlmacenHojas()
+        self.comprobar("varias hojas", lambda: self.libro(almacen, pestañas))
+        self.hojas["/marzo"] += FILAS_NUEVAS
+        almacen.actualizar(self.link("/marzo"), self.reglas)
+        self.comprobar("varias hojas, filas anexadas", lambda: self.libro(almacen, pestañas))
+
+        self.hojas["/abril"] = generar_csv(self.filas // len(pestañas), len(pestañas) + 1) + FILAS_NUEVAS
+        self.comprobar("pestaña nueva tras reinicio", lambda: self.pestaña_nueva(directorio, "/enero", "/abril"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, default=100_000)
+    args = parser.parse_args()
+
+    servidor = servidor_hojas({})
+    verificacion = Verificacion(servidor, args.filas)
+    with tempfile.TemporaryDirectory() as directorio:
+        verificacion.casos(directorio)
+    servidor.shutdown()
+
+    print(f"{args.filas:,} filas")
+    print(f"{'caso':<30} {'tiempo (s)':>10}")
+    fallidos = []
+    for caso, segundos, errores in verificacion.resultados:
+        print(f"{caso:<30} {segundos:>10.3f}  {'✅' if not errores else '❌ ' + ', '.join(errores)}")
+        if errores:
+            fallidos.append(caso)
+    if fallidos:
+        raise SystemExit(f"❌ No coinciden con la hoja completa: {', '.join(fallidos)}")
+    print("✅ Todas las actualizaciones coinciden con preparar la hoja completa")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Clics en el desglose por categoría: ejecución completa frente al fragmento.
+
+Abre la interfaz con `streamlit.testing.v1.AppTest` sobre un libro
+sintético servido por HTTP local y elige categorías en los selectores del
+desglose (`selector_pie` y `selector_barras`). Cada clic se mide dos veces:
+volviendo a ejecutar todo el script (lo que pasaba antes de que el desglose
+fuera un fragmento) y ejecutando solo el fragmento de ese desglose, como lo
+pide el navegador. Comprueba que en ambos casos se muestre el desglose de la
+categoría elegida. Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.bench_desglose --filas 100000 --clics 5
+"""
+import argparse
+import inspect
+import statistics
+import time
+from contextlib import contextmanager
+from dataclasses import replace
+from pathlib import Path
+from unittest import mock
+
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+from benchmarks.bench_actualizacion import servidor_hojas
+from benchmarks.sintetico import generar_csv
+
+APLICACION = Path(__file__).resolve().parent.parent / "codigo.py"
+SIN_SELECCION = "Selecciona una categoría..."
+
+
+def fragmento_desglose(app, clave):
+    """Id del fragmento `mostrar_desglose` registrado con `clave` ("pie" o "barras")"""
+    # AppTest no expone los fragmentos: se buscan por la función y los
+    # argumentos que guarda cada uno
+    for id_fragmento, fragmento in app._fragment_storage._fragments.items():
+        variables = inspect.getclosurevars(fragmento).nonlocals
+        funcion = variables.get("non_optional_func")
+        if getattr(funcion, "__name__", None) != "mostrar_desglose":
+            continue
+        argumentos = inspect.signature(funcion).bind(*variables["args"], **variables["kwargs"]).arguments
+        if argumentos["clave"] == clave:
+            return id_fragmento
+    raise LookupError(f"No se encontró el fragmento del desglose {clave!r}")
+
+
+@contextmanager
+def solo_fragmento(id_fragmento):
+    """Las ejecuciones de AppTest dentro del bloque corren solo ese fragmento.
+
+    AppTest siempre vuelve a ejecutar el script completo; el navegador, al
+    cambiar un control de un fragmento, pide la ejecución de ese fragmento.
+    """
+    pedir = LocalScriptRunner.request_rerun
+
+    def pedir_fragmento(self, datos):
+        aceptada = pedir(self, datos)
+        # Cada ejecución de AppTest usa un runner nuevo que ya tiene pendiente
+        # una ejecución completa, y Streamlit la combinaría con la del
+        # fragmento: se cambia la petición pendiente
+        with self._requests._lock:
+            self._requests._rerun_data = replace(
+                self._requests._rerun_data, fragment_id_queue=[id_fragmento], is_fragment_scoped_rerun=True
+            )
+        return aceptada
+
+    with mock.patch.object(LocalScriptRunner, "request_rerun", pedir_fragmento):
+        yield
+
+
+def medir_clics(app, clave, clics, id_fragmento=None):
+    """Segundos de cada clic en el selector del desglose `clave` y si mostró la categoría elegida"""
+    tiempos, correctos = [], True
+    # Tras ejecutar solo un fragmento el árbol de AppTest solo tiene sus
+    # elementos: una ejecución completa vuelve a mostrar ambos selectores
+    app.run()
+    selector = app.selectbox(key=f"selector_{clave}")
+    opciones = [opcion for opcion in selector.options if opcion != SIN_SELECCION]
+    for i in range(clics):
+        categoria = opciones[i % len(opciones)]
+        app.selectbox(key=f"selector_{clave}").select(categoria)
+        inicio = time.perf_counter()
+        if id_fragmento is None:
+            app.run()
+        else:
+            with solo_fragmento(id_fragmento):
+                app.run()
+        tiempos.append(time.perf_counter() - inicio)
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+        correctos &= any(f"Desglose de: **{categoria}**" in markdown.value for markdown in app.markdown)
+    return tiempos, correctos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, default=100_000)
+    parser.add_argument("--clics", type=int, default=5)
+    args = parser.parse_args()
+
+    servidor = servidor_hojas({"/libro": generar_csv(args.filas)})
+    app = AppTest.from_file(str(APLICACION), default_timeout=300)
+    app.session_state["autenticado"] = True
+    app.session_state["link_sheets"] = f"http://localhost:{servidor.server_address[1]}/libro/export?format=csv&gid=0"
+    # La primera ejecución carga la hoja; la segunda deja las cachés calientes
+    app.run()
+    app.run()
+    if app.exception:
+        raise SystemExit(f"❌ La interfaz falló: {app.exception[0].message}")
+
+    print(f"{args.filas:,} filas, {args.clics} clics por selector (mediana)")
+    print(f"{'selector':<16} {'completa (s)':>13} {'fragmento (s)':>14} {'aceleración':>12}")
+    errores = []
+    for clave in ("pie", "barras"):
+        completa, correctos_completa = medir_clics(app, clave, args.clics)
+        fragmento, correctos_fragmento = medir_clics(app, clave, args.clics, fragmento_desglose(app, clave))
+        if not (correctos_completa and correctos_fragmento):
+            errores.append(clave)
+        mediana_completa, mediana_fragmento = statistics.median(completa), statistics.median(fragmento)
+        print(
+            f"{'selector_' + clave:<16} {mediana_completa:>13.3f} {mediana_fragmento:>14.3f} "
+            f"{mediana_completa / mediana_fragmento:>11.1f}x"
+        )
+    servidor.shutdown()
+
+    if errores:
+        raise SystemExit(f"❌ No se mostró el desglose elegido en: {', '.join(errores)}")
+    print("✅ Ambos modos muestran el desglose de la categoría elegida")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Tiempo y memoria pico de cada etapa del análisis sobre libros sintéticos.
+
+Mide lectura, fechas, categorías, preparación completa, filtros y agregados
+sin pasar por Streamlit. Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.bench_etapas --filas 1000 100000 1000000
+    python -m benchmarks.bench_etapas --guardar base.json
+    python -m benchmarks.bench_etapas --comparar base.json --tolerancia 0.25
+
+Con `--comparar` termina con código 1 si alguna etapa es más lenta que la
+referencia por encima de la tolerancia. La memoria pico es la que ve
+tracemalloc (Python y NumPy); no incluye los búferes de Arrow de las
+columnas de texto.
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import date
+
+from benchmarks.sintetico import generar_csv
+from finanzas.agregados import agregar_balance, construir_cubo, resumir_movimientos
+from finanzas.categorias import ClasificadorCategorias, cargar_reglas
+from finanzas.fechas import IndiceFechas, parsear_fechas
+from finanzas.filtros import filtrar_datos, filtrar_periodo
+from finanzas.ingesta import leer_csv, preparar_hoja
+from finanzas.texto import IndiceTrigramas
+
+
+def medir(funcion, repeticiones):
+    """Mejor tiempo de `repeticiones` corridas y memoria pico (tracemalloc) de una corrida aparte"""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, mejor, pico
+
+
+def etapas(filas, repeticiones):
+    """Corre las etapas en orden; cada una usa el resultado de las anteriores"""
+    contenido = generar_csv(filas)
+    reglas = cargar_reglas()
+    resultados = {}
+
+    def etapa(nombre, funcion):
+        resultado, segundos, pico = medir(funcion, repeticiones)
+        resultados[nombre] = {"segundos": segundos, "pico_mb": pico / 1024 ** 2}
+        return resultado
+
+    data = etapa("leer_csv", lambda: leer_csv(contenido))
+    etapa("parsear_fechas", lambda: parsear_fechas(data["Fecha"]))
+    etapa("clasificar", lambda: ClasificadorCategorias(reglas).clasificar(data["Concepto"]))
+    df = etapa("preparar_hoja", lambda: preparar_hoja(data, reglas)).df
+
+    indice_fechas = etapa("indice_fechas", lambda: IndiceFechas(df["Fecha"]))
+    indice_conceptos = etapa("indice_conceptos", lambda: IndiceTrigramas(df["ConceptoNormalizado"].cat.categories))
+    año = str(df["Fecha"].dt.year.iloc[len(df) // 2])
+    etapa("filtrar_periodo", lambda: filtrar_periodo(df, date(int(año), 3, 1), date(int(año), 9, 30), "Todos", año, indice_fechas))
+    filtrado = etapa("filtrar_texto", lambda: filtrar_datos(
+        df, None, None, "oxxo", "gas", "Todos", "Todos", indice_conceptos, indice_fechas
+    ))
+    etapa("agregar_balance", lambda: agregar_balance(filtrado))
+    movimientos = agregar_balance(df)
+    cubo = etapa("construir_cubo", lambda: construir_cubo(df))
+    etapa("resumir_filas", lambda: resumir_movimientos(movimientos))
+    etapa("resumir_cubo", lambda: resumir_movimientos(cubo))
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--guardar", help="archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", help="archivo JSON de referencia (de --guardar)")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="lentitud relativa permitida")
+    args = parser.parse_args()
+
+    referencia = {}
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            referencia = json.load(archivo)
+
+    todos = {}
+    regresiones = []
+    for filas in args.filas:
+        resultados = etapas(filas, args.repeticiones)
+        todos[str(filas)] = resultados
+        base = referencia.get(str(filas), {})
+        print(f"\n{filas:,} filas")
+        print(f"{'etapa':<18} {'tiempo (s)':>11} {'pico (MB)':>10} {'vs. ref.':>9}")
+        for nombre, medida in resultados.items():
+            cambio = ""
+            if nombre in base:
+                relativo = medida["segundos"] / base[nombre]["segundos"] - 1
+                cambio = f"{relativo:+.0%}"
+                if relativo > args.tolerancia:
+                    regresiones.append(f"{nombre} ({filas:,} filas): {cambio}")
+            print(f"{nombre:<18} {medida['segundos']:>11.4f} {medida['pico_mb']:>10.1f} {cambio:>9}")
+
+    if args.guardar:
+        with open(args.guardar, "w", encoding="utf-8") as archivo:
+            json.dump(todos, archivo, indent=2)
+    if regresiones:
+        raise SystemExit("❌ Etapas más lentas que la referencia:\n  " + "\n  ".join(regresiones))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compara el parser vectorizado de fechas con el bucle fila por fila anterior.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.bench_fechas --filas 1000 10000 50000
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from finanzas.fechas import parsear_fechas
+
+
+def parsear_fechas_bucle(fechas):
+    """Implementación original (bucle con df.loc), conservada como referencia"""
+    df = pd.DataFrame({"Fecha": fechas})
+    df["Fecha_Original"] = df["Fecha"].astype(str)
+    df["Fecha"] = pd.to_datetime(df["Fecha"], dayfirst=True, errors="coerce")
+    fechas_invalidas_mask = df["Fecha"].isna()
+    if fechas_invalidas_mask.any():
+        for idx in df[fechas_invalidas_mask].index:
+            fecha_str = str(df.loc[idx, "Fecha_Original"]).strip()
+            try:
+                if "-" in fecha_str:
+                    partes = fecha_str.split("-")
+                elif "/" in fecha_str:
+                    partes = fecha_str.split("/")
+                else:
+                    continue
+                if len(partes) == 3:
+                    dia, mes, año = partes
+                    if len(año) == 2:
+                        año = "20" + año
+                    fecha_corregida = f"{dia}-{mes}-{año}"
+                    df.loc[idx, "Fecha"] = pd.to_datetime(fecha_corregida, format="%d-%m-%Y", errors="coerce")
+            except:
+                continue
+    return df["Fecha"]
+
+
+def generar_fechas(filas, semilla=0):
+    """Fechas exportadas con formatos mezclados (DD/MM/YYYY, DD-MM-YY, ...)"""
+    rng = random.Random(semilla)
+    formatos = ["%d/%m/%Y", "%d-%m-%y", "%d/%m/%y", "%d-%m-%Y"]
+    inicio = pd.Timestamp("2020-01-01")
+    valores = []
+    for _ in range(filas):
+        fecha = inicio + pd.Timedelta(days=rng.randint(0, 5 * 365))
+        valores.append(fecha.strftime(rng.choice(formatos)))
+    return pd.Series(valores)
+
+
+def medir(funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    args = parser.parse_args()
+
+    print(f"{'filas':>10} {'bucle (s)':>12} {'vectorizado (s)':>16} {'aceleración':>12}")
+    for filas in args.filas:
+        fechas = generar_fechas(filas)
+        esperado, t_bucle = medir(parsear_fechas_bucle, fechas)
+        (obtenido, reporte), t_vector = medir(parsear_fechas, fechas)
+        if not esperado.equals(obtenido):
+            raise SystemExit(f"❌ Resultados distintos con {filas} filas")
+        print(f"{filas:>10} {t_bucle:>12.3f} {t_vector:>16.3f} {t_bucle / t_vector:>11.1f}x")
+    print("Formatos detectados (última corrida):", reporte)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Reporte de memoria: esquema compacto frente al DataFrame anterior.
+
+El esquema anterior guardaba Cantidad como float64 y Concepto, Ingreso /Egreso
+y MesNombre como textos por fila. Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.bench_memoria --filas 100000
+"""
+import argparse
+
+import pandas as pd
+
+from benchmarks.sintetico import generar_csv
+from finanzas.categorias import cargar_reglas
+from finanzas.ingesta import MESES_DICT, leer_csv, preparar_hoja
+
+
+def preparar_esquema_anterior(data):
+    """Tipos del DataFrame antes del esquema compacto (mismas filas y columnas visibles)"""
+    df = data.copy()
+    df["Fecha"] = pd.to_datetime(df["Fecha"], dayfirst=True, errors="coerce", format="mixed")
+    df["Cantidad"] = df["Cantidad"].astype(str).str.replace(",", ".").astype(float)
+    df.dropna(subset=["Fecha", "Cantidad"], inplace=True)
+    df["Concepto"] = df["Concepto"].astype(object)
+    df["Ingreso /Egreso"] = df["Ingreso /Egreso"].astype(object)
+    df["MesNombre"] = df["Fecha"].dt.month.map(MESES_DICT).astype(object)
+    df["ConceptoAgrupado"] = df["Concepto"].str.strip().str.title()
+    return df
+
+
+def memoria_por_columna(df):
+    return df.memory_usage(deep=True, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, default=100_000)
+    args = parser.parse_args()
+
+    data = leer_csv(generar_csv(args.filas))
+    anterior = memoria_por_columna(preparar_esquema_anterior(data))
+    compacto = memoria_por_columna(preparar_hoja(data, cargar_reglas()).df)
+
+    reporte = pd.DataFrame({"anterior (KB)": anterior / 1024, "compacto (KB)": compacto / 1024})
+    reporte.loc["TOTAL"] = reporte.sum()
+    reporte["ahorro"] = 1 - reporte["compacto (KB)"] / reporte["anterior (KB)"]
+    print(f"{args.filas:,} filas")
+    kb = lambda x: "—" if pd.isna(x) else f"{x:,.1f}"
+    porcentaje = lambda x: "—" if pd.isna(x) else f"{x:.0%}"
+    print(reporte.to_string(na_rep="—", formatters={
+        "anterior (KB)": kb, "compacto (KB)": kb, "ahorro": porcentaje,
+    }))
+
+
+if __name__ == "__main__":
+    main()
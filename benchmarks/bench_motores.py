@@ -0,0 +1,122 @@
+"""Filtros y agregados con pandas frente a DuckDB sobre libros sintéticos.
+
+Para cada tamaño mide la preparación de cada motor (índices y cubo de
+pandas, carga del libro en DuckDB) y las consultas de la interfaz con
+varias combinaciones de filtros: filtrar, resumir (métricas y Top 10) y
+desglosar la categoría con más gasto. Antes de medir comprueba que ambos
+motores den exactamente el mismo resultado. Uso (desde la raíz del
+repositorio, con `pip install duckdb`):
+
+    python -m benchmarks.bench_motores --filas 100000 1000000
+"""
+import argparse
+import time
+from datetime import date
+
+from benchmarks.sintetico import generar_csv
+from finanzas.agregados import agregar_balance, construir_cubo, desglose_por_concepto, resumir_movimientos
+from finanzas.categorias import cargar_reglas
+from finanzas.fechas import IndiceFechas
+from finanzas.filtros import filtrar_datos, filtrar_periodo, separar_palabras
+from finanzas.ingesta import leer_csv, preparar_hoja
+from finanzas.motor_duckdb import MotorDuckDB, duckdb_disponible
+from finanzas.texto import IndiceTrigramas
+
+
+def mejor_tiempo(funcion, repeticiones):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return resultado, mejor
+
+
+def combinaciones(año):
+    """Filtros `(start_date, end_date, razon, excluir, mes, año)` representativos"""
+    return {
+        "sin filtros": (None, None, "", "", "Todos", "Todos"),
+        "año y mes": (None, None, "", "", "Marzo", año),
+        "rango de fechas": (date(int(año), 2, 1), date(int(año), 8, 31), "", "", "Todos", "Todos"),
+        "texto": (None, None, "oxxo", "", "Todos", "Todos"),
+        "texto y exclusión": (None, None, "", "renta, nómina, gas", "Todos", año),
+    }
+
+
+class ConsultasPandas:
+    """Lo que hace la interfaz con pandas: índices, cubo sin filtros de texto y filas con ellos"""
+
+    def __init__(self, df):
+        self.df = df
+        self.indice_conceptos = IndiceTrigramas(df["ConceptoNormalizado"].cat.categories)
+        self.indice_fechas = IndiceFechas(df["Fecha"])
+        self.cubo = construir_cubo(df)
+
+    def filtrar_datos(self, filtros):
+        return filtrar_datos(self.df, *filtros, self.indice_conceptos, self.indice_fechas)
+
+    def resumir_movimientos(self, filtros):
+        start_date, end_date, razon, excluir, mes, año = filtros
+        if razon or separar_palabras(excluir):
+            return resumir_movimientos(agregar_balance(self.filtrar_datos(filtros)))
+        return resumir_movimientos(filtrar_periodo(self.cubo, start_date, end_date, mes, año))
+
+    def desglose_por_concepto(self, df_final, categoria, filtros):
+        return desglose_por_concepto(df_final, categoria)
+
+
+def iguales(a, b):
+    """Mismo resultado (valores, índices y tipos) en DataFrames, tuplas o escalares"""
+    if isinstance(a, tuple):
+        return all(iguales(x, y) for x, y in zip(a, b))
+    if hasattr(a, "equals"):
+        return a.equals(b) and a.index.equals(b.index) and (a.dtypes == b.dtypes).all()
+    return a == b
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+    if not duckdb_disponible():
+        raise SystemExit("❌ DuckDB no está instalado (pip install duckdb)")
+
+    diferencias = []
+    for filas in args.filas:
+        df = preparar_hoja(leer_csv(generar_csv(filas)), cargar_reglas()).df
+        año = str(df["Fecha"].dt.year.iloc[len(df) // 2])
+        motores = {}
+        print(f"\n{filas:,} filas")
+        print(f"{'consulta':<34} {'pandas (s)':>11} {'duckdb (s)':>11}")
+        tiempos = {}
+        for nombre, clase in (("pandas", ConsultasPandas), ("duckdb", MotorDuckDB)):
+            motores[nombre], tiempos[nombre] = mejor_tiempo(lambda: clase(df), 1)
+        print(f"{'preparación':<34} {tiempos['pandas']:>11.4f} {tiempos['duckdb']:>11.4f}")
+
+        for descripcion, filtros in combinaciones(año).items():
+            df_final = agregar_balance(motores["pandas"].filtrar_datos(filtros))
+            _, _, top = motores["pandas"].resumir_movimientos(filtros)
+            categoria = str(top["ConceptoAgrupado"].iloc[0]) if len(top) else None
+            consultas = {
+                "filtrar": lambda motor: motor.filtrar_datos(filtros),
+                "resumir": lambda motor: motor.resumir_movimientos(filtros),
+            }
+            if categoria is not None:
+                consultas["desglosar"] = lambda motor: motor.desglose_por_concepto(df_final, categoria, filtros)
+            for consulta, funcion in consultas.items():
+                resultados, tiempos = {}, {}
+                for nombre, motor in motores.items():
+                    resultados[nombre], tiempos[nombre] = mejor_tiempo(lambda: funcion(motor), args.repeticiones)
+                if not iguales(resultados["pandas"], resultados["duckdb"]):
+                    diferencias.append(f"{consulta} / {descripcion} ({filas:,} filas)")
+                etiqueta = f"{consulta} ({descripcion})"
+                print(f"{etiqueta:<34} {tiempos['pandas']:>11.4f} {tiempos['duckdb']:>11.4f}")
+
+    if diferencias:
+        raise SystemExit("❌ Resultados distintos entre motores:\n  " + "\n  ".join(diferencias))
+    print("\n✅ Ambos motores dan los mismos resultados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Carga en streaming frente a la carga completa, contra un servidor lento local.
+
+Levanta un servidor HTTP que envía un libro sintético en bloques con una
+pausa entre ellos (como una exportación grande de Google Sheets) y mide,
+para cada modo, cuándo está disponible el primer resultado, el tiempo
+total y la memoria pico. La memoria se mide en un proceso nuevo por modo:
+el heap de Python (tracemalloc, incluye los arreglos de NumPy) y el pool de
+Arrow, donde pandas guarda los textos. Falla si ambos modos no producen el
+mismo DataFrame o si la carga por partes no usa menos memoria (en Arrow,
+y en el heap de Python si el CSV no cabe en `BYTES_EN_MEMORIA_POR_PARTES`).
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.bench_streaming --filas 200000 --pausa 0.01
+
+`--servir` solo levanta el servidor (para probar la interfaz apuntando a
+http://localhost:PUERTO/export?format=csv&gid=0).
+"""
+import argparse
+import multiprocessing
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pyarrow as pa
+
+from benchmarks.sintetico import generar_csv
+from finanzas.categorias import cargar_reglas
+from finanzas.fuentes import BYTES_EN_MEMORIA_POR_PARTES, AlmacenHojas
+
+
+def servidor_lento(contenido, puerto=0, tamaño_bloque=64 * 1024, pausa=0.01):
+    """Servidor en segundo plano que envía `contenido` por bloques con `pausa` segundos entre ellos"""
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            self.send_header("Content-Length", str(len(contenido)))
+            self.end_headers()
+            for inicio in range(0, len(contenido), tamaño_bloque):
+                self.wfile.write(contenido[inicio:inicio + tamaño_bloque])
+                self.wfile.flush()
+                time.sleep(pausa)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("localhost", puerto), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def cargar(modo, link, reglas, avance, filas_por_parte):
+    """Carga la hoja de `link` en un almacén nuevo, completa o por partes según `modo`"""
+    if modo == "completa":
+        return AlmacenHojas().obtener(link, reglas)
+    return AlmacenHojas().cargar_por_partes(link, reglas, avance, filas_por_parte)
+
+
+def medir(modo, link, reglas, filas_por_parte):
+    """Segundos hasta el primer resultado, segundos totales y estado final"""
+    inicio = time.perf_counter()
+    primero = []
+
+    def avance(parte):
+        if not primero:
+            primero.append(time.perf_counter() - inicio)
+
+    estado = cargar(modo, link, reglas, avance, filas_por_parte)
+    total = time.perf_counter() - inicio
+    return (primero[0] if primero else total), total, estado
+
+
+def pico_memoria(modo, link, filas_por_parte):
+    """Bytes pico del heap de Python y del pool de Arrow durante una carga (en un proceso nuevo)"""
+    reglas = cargar_reglas()
+    tracemalloc.start()
+    cargar(modo, link, reglas, lambda parte: None, filas_por_parte)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # El pico del pool no se puede reiniciar: por eso cada modo usa su proceso
+    return pico, pa.default_memory_pool().max_memory()
+
+
+def pico_en_proceso_nuevo(modo, link, filas_por_parte):
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as proceso:
+        return proceso.submit(pico_memoria, modo, link, filas_por_parte).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, default=200_000)
+    parser.add_argument("--filas-por-parte", type=int, default=50_000)
+    parser.add_argument("--pausa", type=float, default=0.01, help="segundos entre bloques de 64 KB")
+    parser.add_argument("--puerto", type=int, default=0)
+    parser.add_argument("--servir", action="store_true", help="solo levantar el servidor lento")
+    args = parser.parse_args()
+
+    contenido = generar_csv(args.filas)
+    servidor = servidor_lento(contenido, args.puerto, pausa=args.pausa)
+    link = f"http://localhost:{servidor.server_address[1]}/export?format=csv&gid=0"
+    if args.servir:
+        print(f"Sirviendo {args.filas:,} filas en {link} (Ctrl+C para terminar)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            return
+
+    reglas = cargar_reglas()
+    modos = ("completa", "por partes")
+    resultados = {modo: medir(modo, link, reglas, args.filas_por_parte) for modo in modos}
+    picos = {modo: pico_en_proceso_nuevo(modo, link, args.filas_por_parte) for modo in modos}
+    servidor.shutdown()
+
+    print(f"{args.filas:,} filas, {args.filas_por_parte:,} por parte")
+    print(
+        f"{'modo':<11} {'primer resultado (s)':>21} {'total (s)':>10} "
+        f"{'pico Python (MB)':>17} {'pico Arrow (MB)':>16}"
+    )
+    for modo, (primero, total, _) in resultados.items():
+        python, arrow = picos[modo]
+        print(f"{modo:<11} {primero:>21.2f} {total:>10.2f} {python / 1024 ** 2:>17.1f} {arrow / 1024 ** 2:>16.1f}")
+
+    completa, por_partes = resultados["completa"][2], resultados["por partes"][2]
+    iguales = (
+        completa.huella == por_partes.huella
+        and completa.hoja.df.astype(object).equals(por_partes.hoja.df.astype(object))
+        and completa.hoja.df.index.equals(por_partes.hoja.df.index)
+    )
+    if not iguales:
+        raise SystemExit("❌ La carga por partes no coincide con la carga completa")
+    # Con una sola parte ambos modos hacen lo mismo. Con varias, Arrow baja por
+    # leer el CSV por partes; el heap de Python, por no guardar las partes ni
+    # los bloques, salvo si el CSV cabe en la copia en memoria
+    (python_partes, arrow_partes), (python_completa, arrow_completa) = picos["por partes"], picos["completa"]
+    menos_memoria = arrow_partes < arrow_completa and (
+        python_partes < python_completa or len(contenido) <= BYTES_EN_MEMORIA_POR_PARTES
+    )
+    if args.filas <= args.filas_por_parte:
+        print("✅ Mismo resultado en ambos modos (una sola parte: la memoria no se compara)")
+        return
+    if not menos_memoria:
+        raise SystemExit("❌ La carga por partes no usa menos memoria pico que la carga completa")
+    print("✅ Mismo resultado en ambos modos y menos memoria pico por partes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Generador de libros contables sintéticos con el formato de la hoja de Google.
+
+Produce el CSV tal como lo exporta Google Sheets: conceptos en español con
+tildes, fechas en formatos mezclados (DD/MM/YYYY, DD-MM-YY, ...) y
+cantidades con coma decimal.
+"""
+import numpy as np
+import pandas as pd
+
+CONCEPTOS_GASTO = [
+    "Oxxo Centro", "OXXO Gasolinera", "Súper Soriana", "Walmart Express", "HEB San Pedro",
+    "Gasolina Pemex", "Combustible viaje", "Gas natural", "Luz CFE", "Agua y drenaje",
+    "Internet Telmex", "Farmacia Guadalajara", "Medicamentos niños", "Restaurante Pérez",
+    "Comida corrida", "Café Punta del Cielo", "Uber al aeropuerto", "Taxi sitio", "Netflix",
+    "Spotify familiar", "Suscripción gimnasio", "Renta depa", "Alquiler bodega",
+    "Papelería Lumen", "Cine Cinépolis", "Regalo cumpleaños", "Peluquería", "Tintorería",
+]
+CONCEPTOS_INGRESO = ["Nómina", "Pago freelance", "Reembolso", "Venta Mercado Libre", "Intereses"]
+FORMATOS_FECHA = ["%d/%m/%Y", "%d-%m-%y", "%d/%m/%y", "%d-%m-%Y"]
+
+
+def generar_libro(filas, semilla=0, proporcion_invalidas=0.001):
+    """DataFrame crudo (todo texto) con `filas` movimientos"""
+    rng = np.random.default_rng(semilla)
+    dias = rng.integers(0, 5 * 365, filas)
+    fechas = pd.Timestamp("2020-01-01") + pd.to_timedelta(dias, unit="D")
+    formatos = rng.integers(0, len(FORMATOS_FECHA), filas)
+    textos_fecha = np.empty(filas, dtype=object)
+    for i, formato in enumerate(FORMATOS_FECHA):
+        mascara = formatos == i
+        textos_fecha[mascara] = fechas[mascara].strftime(formato)
+    textos_fecha[rng.random(filas) < proporcion_invalidas] = "sin fecha"
+
+    ingreso = rng.random(filas) < 0.08
+    conceptos = np.where(
+        ingreso,
+        rng.choice(CONCEPTOS_INGRESO, filas),
+        rng.choice(CONCEPTOS_GASTO, filas),
+    )
+    centavos = np.where(ingreso, rng.integers(500_000, 3_000_000, filas), -rng.integers(1_000, 500_000, filas))
+    signo = np.where(centavos < 0, "-", "")
+    absolutos = np.abs(centavos)
+    # "1234,56": parte entera y centavos separados por coma
+    cantidades = pd.Series(signo) + pd.Series(absolutos // 100).astype(str) + "," + pd.Series(absolutos % 100).astype(str).str.zfill(2)
+
+    return pd.DataFrame({
+        "Fecha": textos_fecha,
+        "Cantidad": cantidades,
+        "Ingreso /Egreso": np.where(ingreso, "Ingreso", "Egreso"),
+        "Concepto": conceptos,
+    })
+
+
+def generar_csv(filas, semilla=0):
+    """El libro sintético como bytes CSV (lo que devolvería la exportación)"""
+    return generar_libro(filas, semilla).to_csv(index=False).encode("utf-8")
@@ -1,7 +1,42 @@
+import json
+import os
+from concurrent.futures import wait
+from functools import partial
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.express as px
+
+from finanzas.agregados import agregar_balance, construir_cubo, desglose_por_concepto, resumir_movimientos
+from finanzas.categorias import cargar_reglas
+from finanzas.fechas import IndiceFechas
+from finanzas.filtros import filtrar_datos, filtrar_periodo, separar_palabras
+from finanzas.fuentes import (
+    COMPLETA,
+    INCREMENTAL,
+    SIN_CAMBIOS,
+    AlmacenHojas,
+    UsoHojas,
+    calcular_huella,
+    clave_hoja,
+    etiqueta_hoja,
+    separar_enlaces,
+)
+from finanzas.graficas import (
+    COLUMNAS_MOVIMIENTOS,
+    PUNTOS_MAXIMOS_DISPERSION,
+    figura_balance,
+    figura_dispersion,
+    figura_ingresos_gastos,
+    figura_top10_barras,
+    figura_top10_pastel,
+    huella_figura,
+)
+from finanzas.ingesta import ColumnasFaltantes, combinar_hojas, vista_registros, vista_sesion
+from finanzas.metricas import Instrumentacion, registrar_en_consola
+from finanzas.motor_duckdb import MotorDuckDB, duckdb_disponible
+from finanzas.paginacion import Paginador
+from finanzas.texto import IndiceTrigramas
 
 # --------------------------
 # CONFIGURACIÓN INICIAL
@@ -22,67 +57,308 @@ if "autenticado" not in st.session_state:
 if "link_sheets" not in st.session_state:
     st.session_state.link_sheets = ""
 
+# Caché de hojas: vigencia de cada hoja y memoria máxima para todas juntas
+TTL_HOJAS_SEGUNDOS = 30 * 60
+MEMORIA_MAXIMA_HOJAS = 512 * 1024 ** 2
+# Instantáneas en disco de las hojas preparadas, para arrancar sin descargar
+DIRECTORIO_INSTANTANEAS = Path(__file__).parent / ".instantaneas"
+# Cada cuánto revisa la página si hay una versión nueva de la hoja
+INTERVALO_REVISION_SEGUNDOS = 5
+# Tablas paginadas: filas por página disponibles
+TAMAÑOS_PAGINA = [25, 50, 100, 250]
+# Instrumentación: con FINANZAS_INSTRUMENTACION=1 se miden todas las sesiones
+# (con ?debug=1 en la URL solo la propia), cada etapa se registra como una
+# línea JSON en la salida de error y, si se indica un archivo, se escriben
+# ahí las métricas en formato de Prometheus tras cada ejecución
+INSTRUMENTACION_ACTIVA = os.environ.get("FINANZAS_INSTRUMENTACION") == "1"
+ARCHIVO_METRICAS = os.environ.get("FINANZAS_METRICAS_ARCHIVO")
+# Motor de filtros y agregados: "pandas" (por defecto) o "duckdb" (opcional)
+MOTOR_CONSULTAS = os.environ.get("FINANZAS_MOTOR", "pandas")
+
+MENSAJES_ACTUALIZACION = {
+    SIN_CAMBIOS: "✅ La hoja no ha cambiado desde la última carga.",
+    INCREMENTAL: "✅ Se agregaron {filas} registros nuevos.",
+    COMPLETA: "✅ Datos actualizados correctamente.",
+}
+
+# --------------------------
+# INSTRUMENTACIÓN
+# --------------------------
+@st.cache_resource
+def obtener_instrumentacion():
+    """Tiempos e histogramas por etapa y hoja, compartidos por todas las sesiones del proceso"""
+    if INSTRUMENTACION_ACTIVA:
+        registrar_en_consola()
+    return Instrumentacion(activa=INSTRUMENTACION_ACTIVA)
+
+def mostrar_panel_depuracion(registro, instrumentacion):
+    """Panel oculto (solo con ?debug=1) con las etapas de esta ejecución"""
+    with st.sidebar.expander("🐞 Depuración", expanded=True):
+        st.markdown("**Esta ejecución**")
+        st.dataframe(
+            pd.DataFrame([{
+                "Etapa": m.etapa,
+                "Hoja": m.hoja,
+                "ms": round(m.segundos * 1000, 1),
+                "Filas entrada": m.filas_entrada,
+                "Filas salida": m.filas_salida,
+                "Δ memoria (MB)": None if m.memoria_delta is None else round(m.memoria_delta / 1024 ** 2, 1),
+            } for m in registro]),
+            use_container_width=True,
+            hide_index=True,
+        )
+        st.markdown("**Acumulado del proceso**")
+        st.dataframe(pd.DataFrame(instrumentacion.resumen()), use_container_width=True, hide_index=True)
+        st.download_button(
+            "⬇️ Métricas (Prometheus)",
+            instrumentacion.exportar_prometheus(),
+            file_name="metrics.prom",
+            mime="text/plain",
+            use_container_width=True,
+        )
+
+def mostrar_figura(fig, nombre, **opciones):
+    """`st.plotly_chart` midiendo la serialización de la figura"""
+    with medir(f"serializar_{nombre}"):
+        st.plotly_chart(fig, use_container_width=True, **opciones)
+
+@st.cache_resource(show_spinner=False, ttl=TTL_HOJAS_SEGUNDOS, max_entries=64)
+def obtener_figura(nombre, huella, _construir):
+    """Figura ya construida para `nombre` y la huella de sus entradas (compartida por todas las sesiones).
+
+    Se guarda el objeto Figure y no su JSON: `st.plotly_chart` valida de
+    nuevo cualquier especificación en dict o JSON, mientras que una figura
+    lista solo se serializa. `st.plotly_chart` no la modifica.
+    """
+    return _construir()
+
 # --------------------------
 # FUNCIÓN PARA CARGAR DATOS
 # --------------------------
-@st.cache_data
-def cargar_datos_google_public(link_hoja):
-    """Carga un Google Sheet público (link normal o CSV export)"""
+@st.cache_resource
+def obtener_almacen_hojas():
+    """Almacén de hojas cargadas, compartido por todas las sesiones del proceso"""
+    return AlmacenHojas(
+        ttl=TTL_HOJAS_SEGUNDOS,
+        memoria_maxima=MEMORIA_MAXIMA_HOJAS,
+        directorio_instantaneas=DIRECTORIO_INSTANTANEAS,
+        instrumentacion=obtener_instrumentacion(),
+    )
+
+def cargar_hoja_por_partes(link_hoja):
+    """Carga una hoja en streaming mostrando vista previa y métricas parciales mientras llega.
+
+    Si el usuario toca un control durante la carga, Streamlit interrumpe esta
+    ejecución pero la carga sigue en el almacén: la siguiente ejecución vuelve
+    a mostrar las partes ya listas y espera el resto.
+    """
+    progreso = st.empty()
+    acumulado = {"filas": 0, "ingresos": 0, "gastos": 0}
+
+    def avance(parte):
+        centavos = parte.df["Centavos"].to_numpy()
+        acumulado["filas"] += len(centavos)
+        acumulado["ingresos"] += int(centavos[centavos >= 0].sum())
+        acumulado["gastos"] += int(centavos[centavos < 0].sum())
+        with progreso.container():
+            st.info(f"⏳ Cargando la hoja... {acumulado['filas']:,} registros hasta ahora")
+            col1, col2, col3 = st.columns(3)
+            col1.metric("💰 Ingresos", f"${acumulado['ingresos'] / 100:,.2f}")
+            col2.metric("📉 Gastos", f"${acumulado['gastos'] / 100:,.2f}")
+            col3.metric("🧾 Balance neto", f"${(acumulado['ingresos'] + acumulado['gastos']) / 100:,.2f}")
+            st.subheader("📋 Vista previa de los últimos registros recibidos")
+            st.dataframe(vista_registros(parte.df.tail(5).iloc[::-1]), use_container_width=True)
+
+    estado = obtener_almacen_hojas().cargar_por_partes(link_hoja, cargar_reglas(), avance)
+    progreso.empty()
+    return estado
+
+def cargar_datos_google_public(links_hojas):
+    """Carga uno o varios Google Sheets públicos (link normal o CSV export).
+
+    Una sola hoja que aún no está en memoria se lee por partes y se muestra
+    mientras llega; varias se descargan y preparan en paralelo.
+    Devuelve la lista de estados (contenido, huella y datos ya preparados) o
+    None si alguna no se pudo cargar.
+    """
     try:
-        if "export?format=csv" not in link_hoja:
-            sheet_id = link_hoja.split("/d/")[1].split("/")[0]
-            gid = "0"
-            if "gid=" in link_hoja:
-                gid = link_hoja.split("gid=")[1].split("&")[0]
-            link_hoja = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}"
-        data = pd.read_csv(link_hoja)
-        return data
+        if len(links_hojas) == 1:
+            return [cargar_hoja_por_partes(links_hojas[0])]
+        return obtener_almacen_hojas().obtener_varias(links_hojas, cargar_reglas())
+    except ColumnasFaltantes:
+        st.error("❌ El archivo no contiene las columnas necesarias: Fecha, Cantidad, Ingreso /Egreso, Concepto.")
+        st.stop()
     except Exception as e:
         st.error(f"❌ Error cargando los datos: {e}")
-        return pd.DataFrame()
+        return None
+
+@st.cache_resource(show_spinner=False, ttl=TTL_HOJAS_SEGUNDOS, max_entries=8)
+def combinar_libro(version, nombres, _hojas):
+    """Libro único con todas las hojas y su columna Origen (uno por versión de las hojas y de las reglas)"""
+    return combinar_hojas(_hojas, nombres)
 
 # --------------------------
-# FUNCIÓN PARA NORMALIZAR TEXTO (sin tildes)
+# ESTADO DE LA HOJA (ACTUALIZACIÓN EN SEGUNDO PLANO)
 # --------------------------
-def normalizar_texto(texto):
-    """Elimina tildes y convierte a minúsculas"""
-    import unicodedata
-    if pd.isna(texto):
-        return ""
-    texto = str(texto).lower()
-    # Normaliza y elimina tildes
-    texto = unicodedata.normalize('NFD', texto)
-    texto = ''.join(char for char in texto if unicodedata.category(char) != 'Mn')
-    return texto
+def registrar_resultado_actualizacion(futuros):
+    """Guarda en session_state el mensaje de una actualización terminada"""
+    try:
+        resultados = [futuro.result() for futuro in futuros]
+    except Exception as e:
+        st.session_state.error_actualizacion = f"❌ Error actualizando los datos: {e}"
+        return
+    tipos = {resultado for _, resultado, _ in resultados}
+    filas_nuevas = sum(filas for _, resultado, filas in resultados if resultado == INCREMENTAL)
+    resultado = COMPLETA if COMPLETA in tipos else INCREMENTAL if INCREMENTAL in tipos else SIN_CAMBIOS
+    st.session_state.mensaje_actualizacion = MENSAJES_ACTUALIZACION[resultado].format(filas=filas_nuevas)
+
+@st.fragment(run_every=INTERVALO_REVISION_SEGUNDOS)
+def mostrar_estado_hoja(links_hojas, huellas_mostradas):
+    """Muestra "Datos al HH:MM" y recarga la página cuando hay una versión nueva.
+
+    Se ejecuta sola cada INTERVALO_REVISION_SEGUNDOS sin rehacer el resto de
+    la página; también dispara la revalidación de las hojas ya vencidas.
+    """
+    almacen = obtener_almacen_hojas()
+    reglas = cargar_reglas()
+    for link_hoja in links_hojas:
+        almacen.revalidar_si_vencida(link_hoja, reglas)
+
+    futuros = st.session_state.get("actualizacion_en_curso")
+    if futuros is not None and all(futuro.done() for futuro in futuros):
+        del st.session_state["actualizacion_en_curso"]
+        registrar_resultado_actualizacion(futuros)
+        st.rerun()
+
+    estados = [almacen.consultar(link_hoja) for link_hoja in links_hojas]
+    if any(estado is None for estado in estados):
+        return
+    if tuple(estado.huella for estado in estados) != tuple(huellas_mostradas):
+        st.rerun()
+
+    actualizando = any(almacen.en_curso(link_hoja) for link_hoja in links_hojas)
+    fecha_datos = min(estado.actualizada for estado in estados)
+    st.caption(f"🕒 Datos al {fecha_datos:%H:%M}" + (" · 🔄 buscando cambios..." if actualizando else ""))
 
 # --------------------------
-# FUNCIÓN PARA FILTRAR DATOS
+# ÍNDICE DE BÚSQUEDA DE CONCEPTOS
 # --------------------------
-def filtrar_datos(df, start_date, end_date, razon, excluir, mes, año):
-    df_filtered = df.copy()
-
-    if año != "Todos":
-        df_filtered = df_filtered[df_filtered["Fecha"].dt.year == int(año)]
-    if mes != "Todos":
-        df_filtered = df_filtered[df_filtered["MesNombre"] == mes]
-    if start_date:
-        df_filtered = df_filtered[df_filtered["Fecha"] >= pd.to_datetime(start_date)]
-    if end_date:
-        df_filtered = df_filtered[df_filtered["Fecha"] <= pd.to_datetime(end_date)]
-    if razon:
-        # Normalizar el texto de búsqueda
-        razon_normalizada = normalizar_texto(razon)
-        # Crear columna temporal normalizada para comparación
-        df_filtered = df_filtered[df_filtered["Concepto"].apply(normalizar_texto).str.contains(razon_normalizada, na=False)]
-    if excluir:
-        palabras_excluir = [x.strip() for x in excluir.split(",") if x.strip()]
-        if palabras_excluir:
-            # Normalizar cada palabra a excluir
-            palabras_excluir_normalizadas = [normalizar_texto(palabra) for palabra in palabras_excluir]
-            patron = "|".join(palabras_excluir_normalizadas)
-            df_filtered = df_filtered[~df_filtered["Concepto"].apply(normalizar_texto).str.contains(patron, na=False)]
-
-    return df_filtered
+@st.cache_resource(show_spinner=False, ttl=TTL_HOJAS_SEGUNDOS, max_entries=32)
+def obtener_indice_conceptos(huella, _conceptos_normalizados):
+    """Índice de trigramas sobre los conceptos normalizados (uno por hoja)"""
+    return IndiceTrigramas(_conceptos_normalizados.cat.categories)
+
+@st.cache_resource(show_spinner=False, ttl=TTL_HOJAS_SEGUNDOS, max_entries=32)
+def obtener_indice_fechas(huella, _fechas):
+    """Límites por mes del libro ordenado por fecha (uno por hoja)"""
+    return IndiceFechas(_fechas)
+
+# --------------------------
+# CUBO DE AGREGADOS
+# --------------------------
+@st.cache_resource(show_spinner=False, ttl=TTL_HOJAS_SEGUNDOS, max_entries=32)
+def obtener_cubo(version, _df):
+    """Sumas por fecha × categoría × tipo (uno por versión de los datos y de las reglas)"""
+    return construir_cubo(_df)
+
+# --------------------------
+# MOTOR DE CONSULTAS OPCIONAL
+# --------------------------
+@st.cache_resource(show_spinner=False, ttl=TTL_HOJAS_SEGUNDOS, max_entries=8)
+def obtener_motor(version, _df):
+    """Libro cargado en DuckDB (uno por versión de los datos y de las reglas)"""
+    return MotorDuckDB(_df)
+
+# --------------------------
+# TABLA PAGINADA
+# --------------------------
+def mostrar_tabla_paginada(df, clave, firma, columnas_orden=(), ordenado_por=None, nombres=None):
+    """Muestra `df` de página en página: al navegador solo se envía la página actual.
+
+    `firma` identifica los datos y filtros; si cambia se descarta el orden
+    guardado y se vuelve a la primera página. `nombres` renombra columnas
+    solo para mostrarlas.
+    """
+    nombres = nombres or {}
+    estado = st.session_state.get(f"tabla_{clave}")
+    if estado is None or estado["firma"] != firma:
+        estado = {"firma": firma, "paginador": Paginador(df, ordenado_por)}
+        st.session_state[f"tabla_{clave}"] = estado
+        st.session_state[f"{clave}_pagina"] = 1
+    paginador = estado["paginador"]
+
+    col_orden, col_sentido, col_tamaño, col_pagina = st.columns([3, 2, 2, 2])
+    columna, ascendente = ordenado_por, True
+    if columnas_orden:
+        with col_orden:
+            columna = st.selectbox(
+                "Ordenar por", columnas_orden, key=f"{clave}_orden",
+                format_func=lambda c: nombres.get(c, c),
+            )
+        with col_sentido:
+            ascendente = st.radio(
+                "Sentido", ["Ascendente", "Descendente"], horizontal=True, key=f"{clave}_sentido"
+            ) == "Ascendente"
+    with col_tamaño:
+        tamaño = st.selectbox("Filas por página", TAMAÑOS_PAGINA, key=f"{clave}_tamaño")
+    total_paginas = paginador.total_paginas(tamaño)
+    if st.session_state.get(f"{clave}_pagina", 1) > total_paginas:
+        st.session_state[f"{clave}_pagina"] = total_paginas
+    with col_pagina:
+        pagina = st.number_input(
+            f"Página (de {total_paginas:,})", min_value=1, max_value=total_paginas, step=1, key=f"{clave}_pagina"
+        )
+
+    filas = paginador.pagina(pagina, tamaño, columna, ascendente)
+    st.dataframe(filas.rename(columns=nombres), use_container_width=True)
+    inicio = (pagina - 1) * tamaño
+    st.caption(f"Filas {inicio + 1:,}–{inicio + len(filas):,} de {len(df):,}")
+
+# --------------------------
+# DESGLOSE POR CATEGORÍA
+# --------------------------
+@st.fragment
+def mostrar_desglose(df_final, categorias, clave, motor=None, filtros=None):
+    """Selector de categoría con su desglose por concepto y las transacciones de un concepto.
+
+    Es un fragmento: elegir una categoría o un concepto vuelve a ejecutar
+    solo este panel con los datos ya filtrados de la última ejecución
+    completa, sin recargar, filtrar ni redibujar las gráficas. Con `motor`
+    el desglose se consulta en DuckDB con los mismos `filtros`.
+    """
+    categoria_seleccionada = st.selectbox(
+        "🔍 Ver desglose de:",
+        options=["Selecciona una categoría..."] + categorias,
+        key=f"selector_{clave}"
+    )
+    if categoria_seleccionada == "Selecciona una categoría...":
+        return
+
+    # El desglose sí necesita los movimientos individuales
+    if motor is None:
+        desglose, desglose_agrupado = desglose_por_concepto(df_final, categoria_seleccionada)
+    else:
+        desglose, desglose_agrupado = motor.desglose_por_concepto(df_final, categoria_seleccionada, filtros)
+
+    st.markdown(f"#### 📋 Desglose de: **{categoria_seleccionada}**")
+    st.markdown(f"**Total: ${desglose_agrupado['Cantidad'].sum():,.2f}**")
+    st.dataframe(desglose_agrupado, use_container_width=True, hide_index=True)
+
+    # Selector adicional para ver transacciones individuales de un concepto específico
+    conceptos_con_multiples = desglose_agrupado[desglose_agrupado["Número de veces"] > 1]["Concepto"].tolist()
+    if conceptos_con_multiples:
+        st.markdown("---")
+        concepto_detalle = st.selectbox(
+            "🔎 Ver transacciones individuales de:",
+            options=["Selecciona un concepto..."] + conceptos_con_multiples,
+            key=f"selector_detalle_{clave}"
+        )
+
+        if concepto_detalle != "Selecciona un concepto...":
+            transacciones_individuales = desglose[desglose["Concepto"] == concepto_detalle][["Fecha", "Cantidad", "Ingreso /Egreso"]]
+            transacciones_individuales = transacciones_individuales.iloc[::-1]
+            st.markdown(f"##### 🧾 Transacciones de: **{concepto_detalle}**")
+            st.dataframe(transacciones_individuales, use_container_width=True, hide_index=True)
 
 # --------------------------
 # FUNCIÓN PARA EXTRAER URL EDITABLE
@@ -155,92 +431,131 @@ with st.sidebar:
     st.markdown("### ⚙️ Opciones")
 
 # Campo para cambiar el enlace si es necesario
-link = st.text_input("🔗 Enlace de Google Sheet:", value=st.session_state.link_sheets)
+link = st.text_input(
+    "🔗 Enlace de Google Sheet:",
+    value=st.session_state.link_sheets,
+    help="Para combinar varias hojas o pestañas sepáralas con comas. Opcionalmente ponles nombre: 2024=https://docs.google.com/...",
+)
+enlaces = separar_enlaces(link)
+links_hojas = [enlace for _, enlace in enlaces]
+
+# Las hojas que usa esta sesión no se expulsan de la caché compartida
+if "uso_hojas" not in st.session_state:
+    st.session_state.uso_hojas = UsoHojas(obtener_almacen_hojas())
+st.session_state.uso_hojas.usar(links_hojas)
 
 if st.button("🔄 Actualizar datos desde Google Sheets"):
-    st.cache_data.clear()
     st.session_state.link_sheets = link
-    st.success("✅ Datos actualizados correctamente.")
-    st.rerun()
+    try:
+        # Petición condicional en segundo plano: mientras tanto se siguen
+        # mostrando los datos actuales, y si solo se agregaron filas se
+        # procesan únicamente las nuevas
+        reglas = cargar_reglas()
+        futuros = [obtener_almacen_hojas().actualizar_en_segundo_plano(l, reglas) for l in links_hojas]
+    except Exception as e:
+        st.error(f"❌ Error actualizando los datos: {e}")
+    else:
+        # Si la revisión es rápida (lo normal cuando no hubo cambios) se
+        # muestra el resultado de inmediato; si no, lo reporta mostrar_estado_hoja
+        wait(futuros, timeout=1)
+        if all(futuro.done() for futuro in futuros):
+            registrar_resultado_actualizacion(futuros)
+        else:
+            st.session_state.actualizacion_en_curso = futuros
+        st.rerun()
+
+if st.session_state.get("mensaje_actualizacion"):
+    st.success(st.session_state.pop("mensaje_actualizacion"))
+if st.session_state.get("error_actualizacion"):
+    st.error(st.session_state.pop("error_actualizacion"))
 
 # --------------------------
 # CARGA DE DATOS
 # --------------------------
-if link:
-    df = cargar_datos_google_public(link)
-
-    if not df.empty:
-        columnas_requeridas = {"Fecha", "Cantidad", "Ingreso /Egreso", "Concepto"}
-        if not columnas_requeridas.issubset(df.columns):
-            st.error("❌ El archivo no contiene las columnas necesarias: Fecha, Cantidad, Ingreso /Egreso, Concepto.")
-            st.stop()
+# DuckDB solo si se pidió y está instalado; si no, pandas
+usar_duckdb = MOTOR_CONSULTAS == "duckdb" and duckdb_disponible()
+if MOTOR_CONSULTAS == "duckdb" and not usar_duckdb:
+    st.sidebar.warning("⚠️ DuckDB no está instalado; se usa pandas para filtrar y agregar.")
+
+# Etapas de esta ejecución (sin costo si la instrumentación está apagada)
+instrumentacion = obtener_instrumentacion()
+modo_depuracion = st.query_params.get("debug") == "1"
+registro_etapas = []
+# Misma etiqueta que usa el almacén para la hoja (varias pestañas: todas unidas)
+etiqueta_libro = "+".join(etiqueta_hoja(clave_hoja(link_hoja)) for link_hoja in links_hojas)
+medir = partial(
+    instrumentacion.etapa, hoja=etiqueta_libro, registro=registro_etapas,
+    activa=instrumentacion.activa or modo_depuracion,
+)
+
+if links_hojas:
+    with medir("cargar_hojas"):
+        estados_hojas = cargar_datos_google_public(links_hojas)
+
+    if estados_hojas is not None:
+        huellas = tuple(estado.huella for estado in estados_hojas)
+        mostrar_estado_hoja(links_hojas, huellas)
+
+        huella = huellas[0] if len(estados_hojas) == 1 else calcular_huella("|".join(huellas).encode())
+        # Versión de los datos y de las reglas de categorías con que se prepararon
+        version_datos = calcular_huella((huella + json.dumps(cargar_reglas(), sort_keys=True)).encode())
+        if len(estados_hojas) == 1:
+            hoja = estados_hojas[0].hoja
+        else:
+            # Varias hojas o pestañas: un solo libro con la columna Origen
+            with medir("combinar_hojas") as etapa:
+                hoja = combinar_libro(version_datos, tuple(nombre for nombre, _ in enlaces), [e.hoja for e in estados_hojas])
+                etapa.filas_salida = len(hoja.df)
+        # La hoja es compartida y de solo lectura: la sesión trabaja sobre una vista
+        hoja = vista_sesion(hoja)
+        df, fechas_invalidas, reporte_fechas = hoja.df, hoja.fechas_invalidas, hoja.reporte_fechas
+
+        with st.sidebar:
+            with st.expander("🗓️ Formatos de fecha detectados"):
+                st.dataframe(
+                    pd.DataFrame(list(reporte_fechas.items()), columns=["Formato", "Filas"]),
+                    use_container_width=True,
+                    hide_index=True
+                )
+            with st.expander("🗄️ Caché de hojas"):
+                estadisticas = obtener_almacen_hojas().estadisticas()
+                st.markdown(
+                    f"**Aciertos:** {estadisticas['aciertos']} · "
+                    f"**Fallos:** {estadisticas['fallos']} · "
+                    f"**Expulsiones:** {estadisticas['expulsiones']} · "
+                    f"**Desde disco:** {estadisticas['restauraciones']}"
+                )
+                st.caption(
+                    f"{estadisticas['hojas']} hoja(s) en memoria ({estadisticas['en_uso']} en uso) · "
+                    f"{estadisticas['memoria'] / 1024 ** 2:,.1f} MB de {MEMORIA_MAXIMA_HOJAS / 1024 ** 2:,.0f} MB · "
+                    f"motor de consultas: {'DuckDB' if usar_duckdb else 'pandas'}"
+                )
+                if st.button("🧹 Descartar esta hoja de la caché", use_container_width=True):
+                    for link_hoja in links_hojas:
+                        obtener_almacen_hojas().invalidar(link_hoja)
+                    st.rerun()
 
-        # Normalización de datos - Mejorado para manejar diferentes formatos de fecha
-        # Guardamos una copia de la columna original para procesamiento
-        df["Fecha_Original"] = df["Fecha"].astype(str)
-        
-        # Primero intentamos con dayfirst=True
-        df["Fecha"] = pd.to_datetime(df["Fecha"], dayfirst=True, errors="coerce")
-        
-        # Para las fechas que no se pudieron convertir, intentar con formato DD-MM-YY
-        # interpretando YY como 20YY (siglo 21)
-        fechas_invalidas_mask = df["Fecha"].isna()
-        if fechas_invalidas_mask.any():
-            for idx in df[fechas_invalidas_mask].index:
-                fecha_str = str(df.loc[idx, "Fecha_Original"]).strip()
-                try:
-                    # Intentar parsear formato DD-MM-YY o DD/MM/YY
-                    if "-" in fecha_str:
-                        partes = fecha_str.split("-")
-                    elif "/" in fecha_str:
-                        partes = fecha_str.split("/")
-                    else:
-                        continue
-                    
-                    if len(partes) == 3:
-                        dia, mes, año = partes
-                        # Si el año tiene 2 dígitos, convertir a 20YY
-                        if len(año) == 2:
-                            año = "20" + año
-                        fecha_corregida = f"{dia}-{mes}-{año}"
-                        df.loc[idx, "Fecha"] = pd.to_datetime(fecha_corregida, format="%d-%m-%Y", errors="coerce")
-                except:
-                    continue
-        
-        # Eliminar columna temporal
-        df.drop(columns=["Fecha_Original"], inplace=True)
-        
         # Verificar si aún quedan fechas inválidas
-        fechas_invalidas = df[df["Fecha"].isna()]
         if not fechas_invalidas.empty:
             st.warning(f"⚠️ Se encontraron {len(fechas_invalidas)} filas con fechas inválidas después del procesamiento. Revisa el formato en tu Google Sheet.")
             with st.expander("Ver filas con fechas inválidas"):
-                st.dataframe(fechas_invalidas)
-        
-        df["Cantidad"] = df["Cantidad"].astype(str).str.replace(",", ".").astype(float)
-        df.dropna(subset=["Fecha", "Cantidad"], inplace=True)
-
-        meses_dict = {
-            1: "Enero", 2: "Febrero", 3: "Marzo", 4: "Abril",
-            5: "Mayo", 6: "Junio", 7: "Julio", 8: "Agosto",
-            9: "Septiembre", 10: "Octubre", 11: "Noviembre", 12: "Diciembre"
-        }
-        df["MesNombre"] = df["Fecha"].dt.month.map(meses_dict)
+                mostrar_tabla_paginada(fechas_invalidas, "invalidas", huella)
 
         # Vista previa (últimos 5 registros más recientes)
         st.subheader("📋 Vista previa de los últimos 5 registros (más recientes)")
-        df_sorted = df.sort_values("Fecha", ascending=False)
-        
+        # El libro ya viene ordenado por fecha: los más recientes son los últimos
         col_preview, col_button = st.columns([4, 1])
         with col_preview:
-            st.dataframe(df_sorted.head(5), use_container_width=True)
+            st.dataframe(vista_registros(df.tail(5).iloc[::-1]), use_container_width=True)
         
         with col_button:
-            url_editable = obtener_url_editable(link)
-            if url_editable:
-                st.markdown(f'<a href="{url_editable}" target="_blank"><button style="background-color:#4CAF50;color:white;padding:10px 20px;border:none;border-radius:5px;cursor:pointer;width:100%;margin-top:10px;">✏️ Editar Registros</button></a>', unsafe_allow_html=True)
-            else:
-                st.warning("⚠️ No se pudo generar el enlace de edición")
+            for nombre, enlace in enlaces:
+                url_editable = obtener_url_editable(enlace)
+                etiqueta = "✏️ Editar Registros" if len(enlaces) == 1 else f"✏️ Editar {nombre}"
+                if url_editable:
+                    st.markdown(f'<a href="{url_editable}" target="_blank"><button style="background-color:#4CAF50;color:white;padding:10px 20px;border:none;border-radius:5px;cursor:pointer;width:100%;margin-top:10px;">{etiqueta}</button></a>', unsafe_allow_html=True)
+                else:
+                    st.warning("⚠️ No se pudo generar el enlace de edición")
 
         # --------------------------
         # FILTROS
@@ -262,31 +577,60 @@ if link:
         # --------------------------
         # APLICAR FILTROS
         # --------------------------
-        df_filtered = filtrar_datos(df, start_date, end_date, razon, excluir, mes, año)
+        filtros = (start_date, end_date, razon, excluir, mes, año)
+        motor = obtener_motor(version_datos, df) if usar_duckdb else None
+        with medir("filtrar", filas_entrada=len(df)) as etapa:
+            if motor is not None:
+                df_filtered = motor.filtrar_datos(filtros)
+            else:
+                indice_conceptos = obtener_indice_conceptos(huella, df["ConceptoNormalizado"])
+                indice_fechas = obtener_indice_fechas(huella, df["Fecha"])
+                df_filtered = filtrar_datos(df, *filtros, indice_conceptos, indice_fechas)
+            etapa.filas_salida = len(df_filtered)
 
         if df_filtered.empty:
             st.warning("⚠️ No hay datos que coincidan con los filtros seleccionados.")
             st.stop()
 
-        df_final = df_filtered.sort_values("Fecha")
-        df_final["Tipo"] = np.where(df_final["Cantidad"] >= 0, "Ingreso", "Gasto")
-        df_final["Balance Neto"] = df_final["Cantidad"].cumsum()
+        # Ya está ordenado por fecha (el balance acumulado depende de ello)
+        with medir("balance", filas_entrada=len(df_filtered)):
+            df_final = agregar_balance(df_filtered)
 
         # --------------------------
         # TABLA DE MOVIMIENTOS
         # --------------------------
         st.markdown("### 📄 Tabla de movimientos filtrados")
         columnas_mostrar = ["Fecha", "Cantidad", "Ingreso /Egreso", "Concepto", "Balance Neto"]
-        df_mostrar = df_final[columnas_mostrar].copy()
-        df_mostrar.rename(columns={"Balance Neto": "Balance Neto Filtrado"}, inplace=True)
-        st.dataframe(df_mostrar, use_container_width=True)
+        if "Origen" in df_final.columns:
+            columnas_mostrar.insert(0, "Origen")
+        # El balance es el acumulado cronológico de lo filtrado, aunque se ordene por otra columna
+        mostrar_tabla_paginada(
+            df_final[columnas_mostrar],
+            "movimientos",
+            firma=(huella, start_date, end_date, razon, excluir, mes, año),
+            columnas_orden=columnas_mostrar,
+            ordenado_por="Fecha",
+            nombres={"Balance Neto": "Balance Neto Filtrado"},
+        )
 
         # --------------------------
         # MÉTRICAS GENERALES
         # --------------------------
-        total_ingresos = df_final[df_final["Cantidad"] > 0]["Cantidad"].sum()
-        total_gastos = df_final[df_final["Cantidad"] < 0]["Cantidad"].sum()
-        balance = total_ingresos + total_gastos
+        # Sin filtros de texto las sumas salen del cubo precalculado, que
+        # recorre combinaciones fecha × categoría en vez de movimientos
+        with medir("resumen") as etapa:
+            if motor is not None:
+                centavos_ingresos, centavos_gastos, resumen_gastos = motor.resumir_movimientos(filtros)
+            else:
+                if razon or separar_palabras(excluir):
+                    tabla_resumen = df_final
+                else:
+                    tabla_resumen = filtrar_periodo(obtener_cubo(version_datos, df), start_date, end_date, mes, año)
+                etapa.filas_entrada = len(tabla_resumen)
+                centavos_ingresos, centavos_gastos, resumen_gastos = resumir_movimientos(tabla_resumen)
+        total_ingresos = centavos_ingresos / 100
+        total_gastos = centavos_gastos / 100
+        balance = (centavos_ingresos + centavos_gastos) / 100
 
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -300,263 +644,86 @@ if link:
         # VISUALIZACIONES
         # --------------------------
         st.markdown("## 📈 Visualizaciones Interactivas")
+
+        # Huellas de lo que dibujan las figuras: con los mismos movimientos
+        # (aunque lleguen por otros filtros u otra sesión) se reusan ya construidas
+        with medir("huella_figuras", filas_entrada=len(df_final)):
+            huella_movimientos = huella_figura(df_final[COLUMNAS_MOVIMIENTOS])
+            huella_resumen = huella_figura(resumen_gastos[["ConceptoAgrupado", "Cantidad"]])
         col_pie1, col_pie2 = st.columns(2)
 
         # --- Pie chart 1: Ingresos vs Gastos ---
         with col_pie1:
             st.markdown("### 💸 Distribución de ingresos vs gastos")
             if total_ingresos != 0 or total_gastos != 0:
-                df_pie = pd.DataFrame({
-                    "Tipo": ["Ingresos", "Gastos"],
-                    "Monto": [total_ingresos, abs(total_gastos)]
-                })
-                fig_pie = px.pie(
-                    df_pie,
-                    names="Tipo",
-                    values="Monto",
-                    color="Tipo",
-                    color_discrete_map={"Ingresos": "#2ECC71", "Gastos": "#E74C3C"},
-                    title="💹 Proporción de ingresos y gastos",
-                    hole=0.4
-                )
-                fig_pie.update_traces(textinfo='percent+label', pull=[0.05, 0.05])
-                fig_pie.update_layout(template="plotly_dark")
-                st.plotly_chart(fig_pie, use_container_width=True)
+                with medir("figura_ingresos_gastos"):
+                    fig_pie = obtener_figura(
+                        "ingresos_gastos",
+                        huella_figura(total_ingresos, total_gastos),
+                        partial(figura_ingresos_gastos, total_ingresos, total_gastos),
+                    )
+                mostrar_figura(fig_pie, "ingresos_gastos")
             else:
                 st.info("⚠️ No hay datos suficientes para mostrar este gráfico.")
 
         # --- Pie chart 2: Top 10 gastos ---
         with col_pie2:
             st.markdown("### 🛒 Top 10 gastos por concepto")
-            gastos_filtrados = df_final[df_final["Cantidad"] < 0]
-            if not gastos_filtrados.empty:
-                # Función para agrupar conceptos similares
-                def agrupar_concepto(concepto):
-                    concepto_lower = normalizar_texto(concepto)
-                    # Lista de palabras clave para agrupar (orden importa!)
-                    # Primero verificamos OXXO para que tenga prioridad
-                    if "oxxo" in concepto_lower:
-                        return "OXXO"
-                    # Servicios del depa (agua, luz, gas, internet) - solo si NO es de tienda
-                    elif ("agua" in concepto_lower or "luz" in concepto_lower or "cfe" in concepto_lower or 
-                          "internet" in concepto_lower or
-                          ("gas" in concepto_lower and "gasolina" not in concepto_lower and "combustible" not in concepto_lower)):
-                        return "Servicios Depa"
-                    elif "super" in concepto_lower or "soriana" in concepto_lower or "walmart" in concepto_lower or "heb" in concepto_lower:
-                        return "Supermercado"
-                    elif "gasolina" in concepto_lower or "combustible" in concepto_lower:
-                        return "Gasolina"
-                    elif "farmacia" in concepto_lower or "medicamento" in concepto_lower:
-                        return "Farmacia"
-                    elif "restaurante" in concepto_lower or "comida" in concepto_lower or "restaurant" in concepto_lower:
-                        return "Restaurante"
-                    elif "uber" in concepto_lower or "taxi" in concepto_lower or "transporte" in concepto_lower:
-                        return "Transporte"
-                    elif "netflix" in concepto_lower or "spotify" in concepto_lower or "suscripcion" in concepto_lower:
-                        return "Suscripciones"
-                    elif "renta" in concepto_lower or "alquiler" in concepto_lower:
-                        return "Renta"
-                    else:
-                        return concepto.strip().title()
-                
-                # Crear DataFrame con categorías agrupadas
-                gastos_con_categoria = gastos_filtrados.copy()
-                gastos_con_categoria["ConceptoAgrupado"] = gastos_con_categoria["Concepto"].fillna("Sin descripción").apply(agrupar_concepto)
-                
-                resumen_gastos = (
-                    gastos_con_categoria
-                    .groupby("ConceptoAgrupado", as_index=False)["Cantidad"]
-                    .sum()
-                    .sort_values(by="Cantidad")
-                    .head(10)
-                )
-                resumen_gastos["Cantidad"] = resumen_gastos["Cantidad"].abs()
-                fig_pie_gastos = px.pie(
-                    resumen_gastos,
-                    names="ConceptoAgrupado",
-                    values="Cantidad",
-                    title="Top 10 gastos por concepto (click para ver desglose)",
-                    color_discrete_sequence=px.colors.sequential.Magma_r,
-                    hole=0.4
-                )
-                fig_pie_gastos.update_traces(textinfo="percent+label")
-                fig_pie_gastos.update_layout(template="plotly_dark")
-                st.plotly_chart(fig_pie_gastos, use_container_width=True, key="pie_chart")
-                
-                # Selector para ver desglose
-                categoria_seleccionada = st.selectbox(
-                    "🔍 Ver desglose de:",
-                    options=["Selecciona una categoría..."] + resumen_gastos["ConceptoAgrupado"].tolist(),
-                    key="selector_pie"
-                )
+            if not resumen_gastos.empty:
+                with medir("figura_top10_pastel"):
+                    fig_pie_gastos = obtener_figura(
+                        "top10_pastel", huella_resumen, partial(figura_top10_pastel, resumen_gastos)
+                    )
+                mostrar_figura(fig_pie_gastos, "top10_pastel", key="pie_chart")
                 
-                if categoria_seleccionada != "Selecciona una categoría...":
-                    desglose = gastos_con_categoria[gastos_con_categoria["ConceptoAgrupado"] == categoria_seleccionada].copy()
-                    desglose["Cantidad"] = desglose["Cantidad"].abs()
-                    desglose_agrupado = desglose.groupby("Concepto", as_index=False).agg({
-                        "Cantidad": "sum",
-                        "Fecha": "count"
-                    }).rename(columns={"Fecha": "Número de veces"})
-                    desglose_agrupado = desglose_agrupado.sort_values("Cantidad", ascending=False)
-                    
-                    st.markdown(f"#### 📋 Desglose de: **{categoria_seleccionada}**")
-                    st.markdown(f"**Total: ${desglose_agrupado['Cantidad'].sum():,.2f}**")
-                    st.dataframe(desglose_agrupado, use_container_width=True, hide_index=True)
-                    
-                    # Selector adicional para ver transacciones individuales de un concepto específico
-                    conceptos_con_multiples = desglose_agrupado[desglose_agrupado["Número de veces"] > 1]["Concepto"].tolist()
-                    if conceptos_con_multiples:
-                        st.markdown("---")
-                        concepto_detalle = st.selectbox(
-                            "🔎 Ver transacciones individuales de:",
-                            options=["Selecciona un concepto..."] + conceptos_con_multiples,
-                            key="selector_detalle_pie"
-                        )
-                        
-                        if concepto_detalle != "Selecciona un concepto...":
-                            transacciones_individuales = desglose[desglose["Concepto"] == concepto_detalle][["Fecha", "Cantidad", "Ingreso /Egreso"]].copy()
-                            transacciones_individuales = transacciones_individuales.sort_values("Fecha", ascending=False)
-                            st.markdown(f"##### 🧾 Transacciones de: **{concepto_detalle}**")
-                            st.dataframe(transacciones_individuales, use_container_width=True, hide_index=True)
+                mostrar_desglose(df_final, resumen_gastos["ConceptoAgrupado"].tolist(), "pie", motor, filtros)
             else:
                 st.info("⚠️ No hay gastos para mostrar en el gráfico.")
 
         # --- Gráfico de balance acumulado ---
         st.markdown("### 📊 Evolución del balance acumulado")
-        fig_balance = px.line(
-            df_final,
-            x="Fecha",
-            y="Balance Neto",
-            title="📈 Balance acumulado en el tiempo",
-            markers=True,
-            color_discrete_sequence=["#3498DB"]
-        )
-        df_trend = df_final.copy()
-        df_trend["Tendencia"] = df_trend["Balance Neto"].rolling(window=5, min_periods=1).mean()
-        fig_balance.add_scatter(
-            x=df_trend["Fecha"], y=df_trend["Tendencia"],
-            mode="lines", name="Tendencia (suavizada)",
-            line=dict(color="#E67E22", width=3, dash="dot")
-        )
-        fig_balance.update_layout(template="plotly_dark", hovermode="x unified")
-        st.plotly_chart(fig_balance, use_container_width=True)
+        with medir("figura_balance", filas_entrada=len(df_final)):
+            fig_balance = obtener_figura("balance", huella_movimientos, partial(figura_balance, df_final))
+        mostrar_figura(fig_balance, "balance")
 
         # --- Scatter de ingresos y gastos ---
         st.markdown("### 🟢🔴 Distribución de ingresos y gastos")
-        df_final["MontoAbs"] = df_final["Cantidad"].abs()
-        fig_scatter = px.scatter(
-            df_final,
-            x="Fecha",
-            y="MontoAbs",
-            color="Tipo",
-            size=df_final["MontoAbs"],
-            color_discrete_map={"Ingreso": "#2ECC71", "Gasto": "#E74C3C"},
-            hover_data=["Concepto", "Ingreso /Egreso", "Cantidad"],
-            title="🔵 Ingresos y Gastos (tamaño proporcional al monto)"
-        )
-        fig_scatter.update_traces(opacity=0.8)
-        fig_scatter.update_layout(
-            template="plotly_dark",
-            xaxis_title="Fecha",
-            yaxis_title="Monto ($)"
-        )
-        st.plotly_chart(fig_scatter, use_container_width=True)
+        if len(df_final) > PUNTOS_MAXIMOS_DISPERSION:
+            # Los movimientos pequeños apenas se ven: se envían solo los de mayor monto
+            st.caption(
+                f"Se muestran los {PUNTOS_MAXIMOS_DISPERSION:,} movimientos de mayor monto "
+                f"de {len(df_final):,}."
+            )
+        with medir("figura_dispersion", filas_entrada=len(df_final)):
+            fig_scatter = obtener_figura("dispersion", huella_movimientos, partial(figura_dispersion, df_final))
+        mostrar_figura(fig_scatter, "dispersion")
        
         # --- Gráfico de barras horizontales Top 10 gastos ---
         st.markdown("### 📊 Top 10 gastos filtrados (barras horizontales)")
-        if not gastos_filtrados.empty:
-            # Función para agrupar conceptos similares (reutilizamos la misma lógica)
-            def agrupar_concepto(concepto):
-                concepto_lower = normalizar_texto(concepto)
-                # Primero verificamos OXXO para que tenga prioridad
-                if "oxxo" in concepto_lower:
-                    return "OXXO"
-                # Servicios del depa (agua, luz, gas, internet) - solo si NO es de tienda
-                elif ("agua" in concepto_lower or "luz" in concepto_lower or "cfe" in concepto_lower or 
-                      "internet" in concepto_lower or
-                      ("gas" in concepto_lower and "gasolina" not in concepto_lower and "combustible" not in concepto_lower)):
-                    return "Servicios Depa"
-                elif "super" in concepto_lower or "soriana" in concepto_lower or "walmart" in concepto_lower or "heb" in concepto_lower:
-                    return "Supermercado"
-                elif "gasolina" in concepto_lower or "combustible" in concepto_lower:
-                    return "Gasolina"
-                elif "farmacia" in concepto_lower or "medicamento" in concepto_lower:
-                    return "Farmacia"
-                elif "restaurante" in concepto_lower or "comida" in concepto_lower or "restaurant" in concepto_lower:
-                    return "Restaurante"
-                elif "uber" in concepto_lower or "taxi" in concepto_lower or "transporte" in concepto_lower:
-                    return "Transporte"
-                elif "netflix" in concepto_lower or "spotify" in concepto_lower or "suscripcion" in concepto_lower:
-                    return "Suscripciones"
-                elif "renta" in concepto_lower or "alquiler" in concepto_lower:
-                    return "Renta"
-                else:
-                    return concepto.strip().title()
-            
-            # Crear DataFrame con categorías agrupadas
-            gastos_con_categoria_barras = gastos_filtrados.copy()
-            gastos_con_categoria_barras["ConceptoAgrupado"] = gastos_con_categoria_barras["Concepto"].fillna("Sin descripción").apply(agrupar_concepto)
-            
-            # Agrupamos por concepto y sumamos los gastos
-            resumen_gastos_barras = (
-                gastos_con_categoria_barras
-                .groupby("ConceptoAgrupado", as_index=False)["Cantidad"]
-                .sum()
-                .sort_values(by="Cantidad")
-                .head(10)
-            )
-            resumen_gastos_barras["Cantidad"] = resumen_gastos_barras["Cantidad"].abs()
+        if not resumen_gastos.empty:
+            # Mismo Top 10 que el de la gráfica de pastel
+            resumen_gastos_barras = resumen_gastos
 
             # Crear gráfico de barras horizontales
-            fig_barras = px.bar(
-                resumen_gastos_barras,
-                x="Cantidad",
-                y="ConceptoAgrupado",
-                orientation="h",
-                text="Cantidad",
-                color="Cantidad",
-                color_continuous_scale=px.colors.sequential.Magma_r,
-                title="Top 10 gastos filtrados (click para ver desglose)",
-            )
-            fig_barras.update_layout(template="plotly_dark", yaxis={'categoryorder':'total ascending'})
-            st.plotly_chart(fig_barras, use_container_width=True, key="bar_chart")
+            with medir("figura_top10_barras"):
+                fig_barras = obtener_figura(
+                    "top10_barras", huella_resumen, partial(figura_top10_barras, resumen_gastos_barras)
+                )
+            mostrar_figura(fig_barras, "top10_barras", key="bar_chart")
             
-            # Selector para ver desglose
-            categoria_seleccionada_barras = st.selectbox(
-                "🔍 Ver desglose de:",
-                options=["Selecciona una categoría..."] + resumen_gastos_barras.sort_values("Cantidad", ascending=False)["ConceptoAgrupado"].tolist(),
-                key="selector_barras"
+            mostrar_desglose(
+                df_final,
+                resumen_gastos_barras.sort_values("Cantidad", ascending=False)["ConceptoAgrupado"].tolist(),
+                "barras",
+                motor,
+                filtros,
             )
-            
-            if categoria_seleccionada_barras != "Selecciona una categoría...":
-                desglose_barras = gastos_con_categoria_barras[gastos_con_categoria_barras["ConceptoAgrupado"] == categoria_seleccionada_barras].copy()
-                desglose_barras["Cantidad"] = desglose_barras["Cantidad"].abs()
-                desglose_agrupado_barras = desglose_barras.groupby("Concepto", as_index=False).agg({
-                    "Cantidad": "sum",
-                    "Fecha": "count"
-                }).rename(columns={"Fecha": "Número de veces"})
-                desglose_agrupado_barras = desglose_agrupado_barras.sort_values("Cantidad", ascending=False)
-                
-                st.markdown(f"#### 📋 Desglose de: **{categoria_seleccionada_barras}**")
-                st.markdown(f"**Total: ${desglose_agrupado_barras['Cantidad'].sum():,.2f}**")
-                st.dataframe(desglose_agrupado_barras, use_container_width=True, hide_index=True)
-                
-                # Selector adicional para ver transacciones individuales de un concepto específico
-                conceptos_con_multiples_barras = desglose_agrupado_barras[desglose_agrupado_barras["Número de veces"] > 1]["Concepto"].tolist()
-                if conceptos_con_multiples_barras:
-                    st.markdown("---")
-                    concepto_detalle_barras = st.selectbox(
-                        "🔎 Ver transacciones individuales de:",
-                        options=["Selecciona un concepto..."] + conceptos_con_multiples_barras,
-                        key="selector_detalle_barras"
-                    )
-                    
-                    if concepto_detalle_barras != "Selecciona un concepto...":
-                        transacciones_individuales_barras = desglose_barras[desglose_barras["Concepto"] == concepto_detalle_barras][["Fecha", "Cantidad", "Ingreso /Egreso"]].copy()
-                        transacciones_individuales_barras = transacciones_individuales_barras.sort_values("Fecha", ascending=False)
-                        st.markdown(f"##### 🧾 Transacciones de: **{concepto_detalle_barras}**")
-                        st.dataframe(transacciones_individuales_barras, use_container_width=True, hide_index=True)
         else:
             st.info("⚠️ No hay gastos para mostrar en la gráfica de barras.")
+
+        if modo_depuracion:
+            mostrar_panel_depuracion(registro_etapas, instrumentacion)
+        if ARCHIVO_METRICAS and instrumentacion.activa:
+            instrumentacion.escribir_prometheus(ARCHIVO_METRICAS)
 else:
     st.warning("⚠️ Por favor ingresa un enlace válido de Google Sheets para comenzar.")
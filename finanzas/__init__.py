@@ -0,0 +1,8 @@
+"""Funciones de análisis financiero independientes de la interfaz de Streamlit."""
+import pandas as pd
+
+# Las hojas preparadas se comparten entre sesiones y las sesiones trabajan
+# sobre copias superficiales: copy-on-write (por defecto desde pandas 3)
+# garantiza que modificar una copia nunca cambie la original.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+TIPOS_MOVIMIENTO = ["Ingreso", "Gasto"]
+
+
+# --------------------------
+# CUBO DE AGREGADOS
+# --------------------------
+def tipo_movimiento(centavos):
+    """Ingreso (monto >= 0) o Gasto (monto < 0) como categoría"""
+    return pd.Categorical(np.where(centavos >= 0, "Ingreso", "Gasto"), categories=TIPOS_MOVIMIENTO)
+
+
+def construir_cubo(df):
+    """Sumas y conteos de centavos por fecha × categoría agrupada × tipo.
+
+    Tiene las mismas columnas de filtrado que el libro (`Fecha`, `MesNombre`),
+    así que los filtros de periodo se aplican igual a ambos y el resultado
+    ocupa tantas filas como combinaciones existentes, no como movimientos.
+    """
+    tipo = pd.Series(tipo_movimiento(df["Centavos"].to_numpy()), index=df.index, name="Tipo")
+    return (
+        df.groupby([df["Fecha"], df["MesNombre"], df["ConceptoAgrupado"], tipo], observed=True)["Centavos"]
+        .agg(Centavos="sum", Movimientos="count")
+        .reset_index()
+    )
+
+
+def resumir_movimientos(tabla, n=10):
+    """Totales de ingresos y gastos (en centavos) y los `n` gastos mayores por categoría.
+
+    `tabla` puede ser el libro filtrado o el cubo filtrado: ambos tienen
+    `Tipo`, `ConceptoAgrupado` y `Centavos`, y el resultado es el mismo.
+    """
+    es_gasto = (tabla["Tipo"] == "Gasto").to_numpy()
+    gastos = tabla[es_gasto]
+    top_gastos = (
+        gastos
+        .groupby("ConceptoAgrupado", as_index=False, observed=True)["Centavos"]
+        .sum()
+        .sort_values(by="Centavos")
+        .head(n)
+    )
+    top_gastos["Cantidad"] = top_gastos["Centavos"].abs() / 100
+    return int(tabla["Centavos"].to_numpy()[~es_gasto].sum()), int(gastos["Centavos"].sum()), top_gastos
+
+
+# --------------------------
+# MOVIMIENTOS FILTRADOS
+# --------------------------
+def agregar_balance(df):
+    """Agrega `Cantidad` (pesos), `Tipo` y `Balance Neto` (acumulado cronológico).
+
+    `df` debe venir ordenado por fecha; las sumas se hacen en centavos.
+    """
+    df = df.copy(deep=False)
+    df["Cantidad"] = df["Centavos"] / 100
+    df["Tipo"] = tipo_movimiento(df["Centavos"].to_numpy())
+    df["Balance Neto"] = df["Centavos"].cumsum() / 100
+    return df
+
+
+def desglose_por_concepto(df, categoria):
+    """Gastos de una categoría agrupada y su resumen por concepto (monto y número de veces)"""
+    desglose = df[(df["Tipo"] == "Gasto") & (df["ConceptoAgrupado"] == categoria)]
+    desglose["Cantidad"] = desglose["Cantidad"].abs()
+    desglose_agrupado = desglose.groupby("Concepto", as_index=False, observed=True).agg(**{
+        "Cantidad": ("Centavos", "sum"),
+        "Número de veces": ("Fecha", "count")
+    })
+    desglose_agrupado["Cantidad"] = desglose_agrupado["Cantidad"].abs() / 100
+    return desglose, desglose_agrupado.sort_values("Cantidad", ascending=False)
+
+
+# --------------------------
+# RESÚMENES PARA REPORTES
+# --------------------------
+def resumen_mensual(df):
+    """Ingresos, gastos, balance (en pesos) y número de movimientos por mes"""
+    centavos = df["Centavos"]
+    mes = df["Fecha"].dt.to_period("M").rename("Mes")
+    resumen = pd.DataFrame({
+        "Ingresos": centavos.where(centavos >= 0, 0),
+        "Gastos": centavos.where(centavos < 0, 0),
+        "Movimientos": 1,
+    }).groupby(mes).sum()
+    resumen["Balance"] = resumen["Ingresos"] + resumen["Gastos"]
+    resumen[["Ingresos", "Gastos", "Balance"]] /= 100
+    return resumen[["Ingresos", "Gastos", "Balance", "Movimientos"]].reset_index()
+
+
+def gastos_mensuales_por_categoria(df):
+    """Gasto (en pesos, positivo) y número de gastos por mes y categoría agrupada"""
+    gastos = df[df["Centavos"] < 0]
+    resumen = (
+        gastos
+        .groupby([gastos["Fecha"].dt.to_period("M").rename("Mes"), gastos["ConceptoAgrupado"]], observed=True)["Centavos"]
+        .agg(Cantidad="sum", Movimientos="count")
+        .reset_index()
+    )
+    resumen["Cantidad"] = resumen["Cantidad"].abs() / 100
+    return resumen
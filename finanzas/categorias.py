@@ -0,0 +1,111 @@
+import json
+import re
+from pathlib import Path
+
+import pandas as pd
+
+from finanzas.texto import normalizar_texto
+
+# --------------------------
+# REGLAS DE CATEGORIZACIÓN
+# --------------------------
+# Tabla declarativa de reglas: cada regla asigna `categoria` cuando el concepto
+# contiene alguna de sus `palabras` y ninguna de las de `excluir`. Gana la regla
+# con menor `prioridad` (a igual prioridad, la que aparece primero).
+RUTA_REGLAS = Path(__file__).resolve().parent.parent / "reglas_categorias.json"
+
+SIN_DESCRIPCION = "Sin descripción"
+
+
+def cargar_reglas(ruta=RUTA_REGLAS):
+    """Lee la tabla de reglas desde un archivo JSON (lista de objetos)"""
+    ruta = Path(ruta)
+    if not ruta.exists():
+        return []
+    with ruta.open(encoding="utf-8") as archivo:
+        reglas = json.load(archivo)
+    if not isinstance(reglas, list):
+        raise ValueError(f"{ruta.name} debe contener una lista de reglas")
+    for regla in reglas:
+        if not _regla_valida(regla):
+            raise ValueError(f"Regla inválida en {ruta.name}: {regla}")
+    return reglas
+
+
+def _lista_de_textos(valor):
+    return isinstance(valor, list) and all(isinstance(p, str) for p in valor)
+
+
+def _regla_valida(regla):
+    """`categoria` de texto, `palabras` (y `excluir`) listas de textos y `prioridad` numérica"""
+    return (
+        isinstance(regla, dict)
+        and isinstance(regla.get("categoria"), str) and bool(regla["categoria"])
+        and _lista_de_textos(regla.get("palabras")) and bool(regla["palabras"])
+        and _lista_de_textos(regla.get("excluir", []))
+        # bool es subclase de int, pero "prioridad": true es un error
+        and isinstance(regla.get("prioridad", 100), (int, float))
+        and not isinstance(regla.get("prioridad", 100), bool)
+    )
+
+
+class ClasificadorCategorias:
+    """Compila la tabla de reglas en una sola expresión regular.
+
+    La expresión es una alternancia dentro de un lookahead, de modo que una
+    sola pasada por el texto encuentra todas las palabras clave presentes
+    (incluidas las que se traslapan, como "gas" dentro de "gasolina").
+    """
+
+    def __init__(self, reglas):
+        self.reglas = [
+            {
+                "categoria": regla["categoria"],
+                "palabras": {normalizar_texto(p) for p in regla["palabras"] if p},
+                "excluir": {normalizar_texto(p) for p in regla.get("excluir", []) if p},
+            }
+            for _, _, regla in sorted(
+                (regla.get("prioridad", 100), orden, regla) for orden, regla in enumerate(reglas)
+            )
+        ]
+        palabras = set()
+        for regla in self.reglas:
+            palabras |= regla["palabras"] | regla["excluir"]
+
+        # En cada posición la alternancia toma la primera opción que coincide;
+        # ordenando de mayor a menor longitud esa es la más larga, y las demás
+        # que empiezan ahí son subcadenas suyas.
+        alternativas = sorted(palabras, key=len, reverse=True)
+        self._patron = (
+            re.compile("(?=(" + "|".join(map(re.escape, alternativas)) + "))")
+            if alternativas else None
+        )
+        self._contenidas = {p: {q for q in palabras if q in p} for p in palabras}
+
+    def palabras_presentes(self, texto_normalizado):
+        """Conjunto de palabras clave (de cualquier regla) contenidas en el texto"""
+        presentes = set()
+        if self._patron is not None:
+            for coincidencia in self._patron.finditer(texto_normalizado):
+                presentes |= self._contenidas[coincidencia.group(1)]
+        return presentes
+
+    def clasificar_texto(self, concepto):
+        """Categoría de un concepto; sin coincidencias se usa el concepto en formato título"""
+        presentes = self.palabras_presentes(normalizar_texto(concepto))
+        for regla in self.reglas:
+            if regla["palabras"] & presentes and not regla["excluir"] & presentes:
+                return regla["categoria"]
+        return concepto.strip().title()
+
+    def clasificar(self, conceptos):
+        """Clasifica una columna de conceptos evaluando cada valor único una sola vez"""
+        codigos, unicos = pd.factorize(conceptos)
+        # El código -1 (concepto vacío) apunta a SIN_DESCRIPCION, agregado al final
+        categorias_unicos = [self.clasificar_texto(str(concepto)) for concepto in unicos]
+        categorias_unicos.append(self.clasificar_texto(SIN_DESCRIPCION))
+        codigos_categoria, categorias = pd.factorize(pd.Series(categorias_unicos, dtype=str))
+        return pd.Series(
+            pd.Categorical.from_codes(codigos_categoria[codigos], categories=categorias),
+            index=conceptos.index,
+        )
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+# --------------------------
+# PARSEO VECTORIZADO DE FECHAS
+# --------------------------
+FORMATO_AUTOMATICO = "Automático (día primero)"
+FORMATO_INVALIDO = "Inválida"
+
+# Textos que pandas ignora al inferir el formato de una columna
+_TEXTOS_NULOS = {"", "NaT", "nat", "NAT", "nan", "NaN", "NAN", "now", "today"}
+
+# Partes de una fecha separada por "-" o por "/" (misma semántica que str.split)
+_PATRON_GUION = r"^([^-]*)-([^-]*)-([^-]*)$"
+_PATRON_DIAGONAL = r"^([^/]*)/([^/]*)/([^/]*)$"
+
+
+def _corregir_formatos(textos):
+    """Intenta DD-MM-YY, DD-MM-YYYY, DD/MM/YY y DD/MM/YYYY sobre valores únicos.
+
+    Los años de 2 dígitos se interpretan como 20YY. Devuelve las fechas
+    corregidas (NaT si no se pudo) y la etiqueta del formato que coincidió.
+    """
+    textos = textos.str.strip()
+    con_guion = textos.str.contains("-", regex=False)
+    con_diagonal = ~con_guion & textos.str.contains("/", regex=False)
+
+    partes = pd.DataFrame(index=textos.index, columns=[0, 1, 2], dtype=object)
+    if con_guion.any():
+        partes.loc[con_guion] = textos[con_guion].str.extract(_PATRON_GUION).values
+    if con_diagonal.any():
+        partes.loc[con_diagonal] = textos[con_diagonal].str.extract(_PATRON_DIAGONAL).values
+
+    dia, mes, año = partes[0], partes[1], partes[2]
+    año_corto = año.str.len() == 2
+    año = año.where(~año_corto, "20" + año)
+
+    fechas = pd.to_datetime(dia + "-" + mes + "-" + año, format="%d-%m-%Y", errors="coerce")
+
+    separador = pd.Series(np.where(con_guion, "-", "/"), index=textos.index)
+    sufijo = pd.Series(np.where(año_corto, "YY", "YYYY"), index=textos.index)
+    etiquetas = "DD" + separador + "MM" + separador + sufijo
+    etiquetas = etiquetas.where(fechas.notna(), FORMATO_INVALIDO)
+    return fechas, etiquetas
+
+
+def inferir_formato_fecha(fechas):
+    """Formato que `pd.to_datetime(dayfirst=True)` inferiría para la columna.
+
+    Igual que pandas, se usa el primer valor no nulo; si no es texto o no se
+    reconoce su formato se devuelve "mixed" (cada valor se parsea por separado).
+    Sirve para parsear filas nuevas de una hoja con el mismo formato que el
+    resto, aunque la primera fila nueva tenga otro.
+    """
+    for valor in fechas:
+        if pd.isna(valor) or (isinstance(valor, str) and valor in _TEXTOS_NULOS):
+            continue
+        if isinstance(valor, str):
+            return guess_datetime_format(valor, dayfirst=True) or "mixed"
+        break
+    return "mixed"
+
+
+def parsear_fechas(fechas, formato=None):
+    """Convierte una columna de fechas de la hoja a datetime.
+
+    Primero se aplica `pd.to_datetime(dayfirst=True)` y, para lo que quede
+    como NaT, los formatos DD-MM-YY / DD/MM/YY (con año 20YY) y sus variantes
+    de 4 dígitos. Cada texto distinto se parsea una sola vez y el resultado se
+    expande a todas las filas. `formato` fija el formato de la primera pasada
+    (por defecto el que pandas inferiría, ver `inferir_formato_fecha`).
+
+    Devuelve `(serie_datetime, reporte)`, donde `reporte` es un dict
+    {formato: número de filas}.
+    """
+    codigos, unicos = pd.factorize(fechas)
+    unicos = pd.Series(unicos)
+
+    if formato is None:
+        formato = inferir_formato_fecha(unicos)
+    parseadas = pd.to_datetime(unicos, format=formato, dayfirst=True, errors="coerce")
+    etiquetas = pd.Series(FORMATO_AUTOMATICO, index=unicos.index)
+
+    pendientes = parseadas.isna()
+    if pendientes.any():
+        corregidas, etiquetas_corregidas = _corregir_formatos(unicos[pendientes].astype(str))
+        parseadas[pendientes] = corregidas
+        etiquetas[pendientes] = etiquetas_corregidas
+
+    # Expandir de valores únicos a filas; el código -1 (celda vacía) toma el NaT final
+    validos = codigos >= 0
+    valores = np.append(parseadas.to_numpy(), np.datetime64("NaT"))
+    resultado = pd.Series(valores[codigos], index=fechas.index)
+
+    filas_por_unico = np.bincount(codigos[validos], minlength=len(unicos))
+    reporte = (
+        pd.Series(filas_por_unico, index=etiquetas.values)
+        .groupby(level=0, sort=False)
+        .sum()
+        .to_dict()
+    )
+    vacias = int((~validos).sum())
+    if vacias:
+        reporte[FORMATO_INVALIDO] = reporte.get(FORMATO_INVALIDO, 0) + vacias
+    reporte = {formato: int(filas) for formato, filas in reporte.items() if filas}
+    return resultado, reporte
+
+
+# --------------------------
+# FILTRADO POR RANGO SOBRE FECHAS ORDENADAS
+# --------------------------
+class IndiceFechas:
+    """Límites de cada mes en una columna de fechas ordenada de forma ascendente.
+
+    Los filtros de año y de rango de fechas se resuelven con búsqueda binaria
+    y dan un `slice`; el de mes (que puede repetirse en varios años) une los
+    tramos de ese mes dentro del rango.
+    """
+
+    def __init__(self, fechas):
+        self._fechas = fechas.to_numpy()
+        meses = (fechas.dt.year * 12 + fechas.dt.month - 1).to_numpy()
+        self._inicios = np.flatnonzero(np.r_[True, meses[1:] != meses[:-1]]) if len(meses) else np.array([], dtype=int)
+        self._finales = np.r_[self._inicios[1:], len(meses)].astype(int)
+        self._meses = meses[self._inicios] % 12 + 1
+
+    def _buscar(self, fecha, lado):
+        return int(np.searchsorted(self._fechas, pd.Timestamp(fecha).to_datetime64(), side=lado))
+
+    def posiciones(self, inicio=None, fin=None, mes=None, año=None):
+        """Filas con `inicio <= Fecha <= fin`, del mes (1-12) y del año indicados.
+
+        Devuelve un `slice`, o un arreglo de posiciones si el mes aparece en
+        varios años del rango.
+        """
+        desde, hasta = 0, len(self._fechas)
+        if año is not None:
+            desde = max(desde, self._buscar(pd.Timestamp(año, 1, 1), "left"))
+            hasta = min(hasta, self._buscar(pd.Timestamp(año + 1, 1, 1), "left"))
+        if inicio is not None:
+            desde = max(desde, self._buscar(inicio, "left"))
+        if fin is not None:
+            hasta = min(hasta, self._buscar(fin, "right"))
+        hasta = max(desde, hasta)
+        if mes is None:
+            return slice(desde, hasta)
+
+        tramos = [
+            (max(a, desde), min(b, hasta))
+            for a, b in zip(self._inicios[self._meses == mes], self._finales[self._meses == mes])
+            if a < hasta and b > desde
+        ]
+        if len(tramos) <= 1:
+            return slice(*tramos[0]) if tramos else slice(desde, desde)
+        return np.concatenate([np.arange(a, b) for a, b in tramos])
+
@@ -0,0 +1,61 @@
+import pandas as pd
+
+from finanzas.ingesta import MESES_DICT
+from finanzas.texto import mascara_contiene, normalizar_texto
+
+NUMERO_MES = {nombre: numero for numero, nombre in MESES_DICT.items()}
+
+
+# --------------------------
+# FILTROS DEL LIBRO
+# --------------------------
+def filtrar_periodo(df, start_date, end_date, mes, año, indice_fechas=None):
+    """Filtros de fecha, mes y año; sirve tanto para el libro como para el cubo.
+
+    Con `indice_fechas` (libro ordenado por fecha) se resuelven con búsqueda
+    binaria y se toma una rebanada de filas en vez de aplicar máscaras.
+    """
+    if indice_fechas is not None:
+        return df.iloc[indice_fechas.posiciones(
+            inicio=start_date or None,
+            fin=end_date or None,
+            mes=NUMERO_MES[mes] if mes != "Todos" else None,
+            año=int(año) if año != "Todos" else None,
+        )]
+    if año != "Todos":
+        df = df[df["Fecha"].dt.year == int(año)]
+    if mes != "Todos":
+        df = df[df["MesNombre"] == mes]
+    if start_date:
+        df = df[df["Fecha"] >= pd.to_datetime(start_date)]
+    if end_date:
+        df = df[df["Fecha"] <= pd.to_datetime(end_date)]
+    return df
+
+
+def separar_palabras(texto):
+    """Palabras separadas por comas, sin espacios ni vacías"""
+    return [x.strip() for x in texto.split(",") if x.strip()]
+
+
+def filtrar_datos(df, start_date, end_date, razon, excluir, mes, año, indice=None, indice_fechas=None):
+    """Aplica los filtros de la barra de filtros al libro preparado.
+
+    `indice` (IndiceTrigramas) e `indice_fechas` (IndiceFechas) son opcionales
+    y solo aceleran la búsqueda; sin ellos el resultado es el mismo.
+    """
+    # Primero el periodo (rebanada del libro ordenado) y los textos solo sobre ella
+    df_filtered = filtrar_periodo(df, start_date, end_date, mes, año, indice_fechas)
+
+    if razon:
+        # Normalizar el texto de búsqueda y compararlo con el concepto ya normalizado
+        razon_normalizada = normalizar_texto(razon)
+        df_filtered = df_filtered[mascara_contiene(df_filtered["ConceptoNormalizado"], [razon_normalizada], indice)]
+    if excluir:
+        palabras_excluir = separar_palabras(excluir)
+        if palabras_excluir:
+            # Normalizar cada palabra a excluir
+            palabras_excluir_normalizadas = [normalizar_texto(palabra) for palabra in palabras_excluir]
+            df_filtered = df_filtered[~mascara_contiene(df_filtered["ConceptoNormalizado"], palabras_excluir_normalizadas, indice)]
+
+    return df_filtered
@@ -0,0 +1,644 @@
+import hashlib
+import logging
+import re
+import tempfile
+import threading
+import time
+import weakref
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
+from datetime import datetime
+from functools import partial
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from finanzas.ingesta import (
+    FILAS_POR_PARTE, anexar_filas, filas_desde, leer_csv, preparar_hoja, preparar_por_partes,
+)
+from finanzas.instantaneas import borrar_instantanea, cargar_instantanea, guardar_instantanea
+from finanzas.metricas import ETAPA_INACTIVA, sin_medir
+
+logger = logging.getLogger(__name__)
+
+# Resultados posibles de una actualización
+SIN_CAMBIOS = "sin_cambios"
+INCREMENTAL = "incremental"
+COMPLETA = "completa"
+
+# Cada cuánto revisa quien espera una carga por partes si ya hay partes nuevas
+INTERVALO_PARTES_SEGUNDOS = 0.05
+
+# Bytes de una carga por partes que se copian en memoria; lo que pase de ahí
+# se copia a un archivo temporal hasta terminar de preparar la hoja
+BYTES_EN_MEMORIA_POR_PARTES = 4 * 1024 ** 2
+
+
+# --------------------------
+# URL Y DESCARGA DE LA HOJA
+# --------------------------
+def clave_hoja(link_hoja):
+    """Clave canónica `(sheet_id, gid)` de una hoja, sin importar la forma del enlace.
+
+    Para enlaces de exportación que no son de Google (por ejemplo un servidor
+    local de pruebas) se usa la URL sin parámetros en lugar del sheet_id.
+    """
+    if "/d/" in link_hoja:
+        sheet_id = link_hoja.split("/d/")[1].split("/")[0]
+    else:
+        sheet_id = link_hoja.split("?")[0]
+    gid = "0"
+    if "gid=" in link_hoja:
+        gid = link_hoja.split("gid=")[1].split("&")[0].split("#")[0]
+    return sheet_id, gid
+
+
+def etiqueta_hoja(clave):
+    """Nombre corto de una hoja para métricas y registros (`sheet_id#gid` recortado)"""
+    sheet_id, gid = clave
+    return f"{sheet_id.rstrip('/').rsplit('/', 1)[-1][:16]}#{gid}"
+
+
+def url_exportacion(link_hoja):
+    """URL de exportación CSV de un Google Sheet público (link normal o CSV export)"""
+    if "export?format=csv" in link_hoja:
+        return link_hoja
+    if "/d/" not in link_hoja:
+        raise ValueError("El enlace no corresponde a un Google Sheet")
+    sheet_id, gid = clave_hoja(link_hoja)
+    return f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}"
+
+
+def separar_enlaces(texto):
+    """Lista de `(nombre, enlace)` a partir de uno o varios enlaces.
+
+    Los enlaces se separan con comas, punto y coma o saltos de línea, y cada
+    uno puede llevar un nombre delante: `2024=https://docs.google.com/...`.
+    Sin nombre se usa el número de pestaña (gid).
+    """
+    enlaces = []
+    for parte in re.split(r"[,;\s]+", texto.strip()):
+        if not parte:
+            continue
+        nombre, enlace = None, parte
+        if "=" in parte and "/" not in parte.split("=", 1)[0]:
+            nombre, enlace = parte.split("=", 1)
+        if not nombre:
+            sheet_id, gid = clave_hoja(enlace)
+            nombre = f"{sheet_id.rstrip('/').split('/')[-1][:12]} · gid {gid}"
+        enlaces.append((nombre, enlace))
+    return enlaces
+
+
+def calcular_huella(contenido):
+    """Hash del contenido descargado"""
+    return hashlib.sha1(contenido).hexdigest()
+
+
+@dataclass
+class Descarga:
+    contenido: bytes = None
+    etag: str = None
+    ultima_modificacion: str = None
+    no_modificado: bool = False
+
+
+_sesion = None
+_candado_sesion = threading.Lock()
+
+
+def obtener_sesion():
+    """Sesión HTTP compartida: conexiones keep-alive reutilizables y compresión gzip"""
+    global _sesion
+    with _candado_sesion:
+        if _sesion is None:
+            _sesion = requests.Session()
+            _sesion.headers["Accept-Encoding"] = "gzip, deflate"
+            adaptador = HTTPAdapter(pool_connections=8, pool_maxsize=16)
+            _sesion.mount("http://", adaptador)
+            _sesion.mount("https://", adaptador)
+        return _sesion
+
+
+def descargar_csv(url, etag=None, ultima_modificacion=None, timeout=30):
+    """Descarga la hoja con una petición condicional (If-None-Match / If-Modified-Since).
+
+    Si el servidor responde 304 se devuelve `Descarga(no_modificado=True)`.
+    """
+    encabezados = {}
+    if etag:
+        encabezados["If-None-Match"] = etag
+    if ultima_modificacion:
+        encabezados["If-Modified-Since"] = ultima_modificacion
+    respuesta = obtener_sesion().get(url, headers=encabezados, timeout=timeout)
+    if respuesta.status_code == 304:
+        return Descarga(etag=etag, ultima_modificacion=ultima_modificacion, no_modificado=True)
+    respuesta.raise_for_status()
+    return Descarga(
+        contenido=respuesta.content,
+        etag=respuesta.headers.get("ETag"),
+        ultima_modificacion=respuesta.headers.get("Last-Modified"),
+    )
+
+
+def abrir_csv(url, timeout=30, tamaño_bloque=64 * 1024):
+    """Descarga la hoja en streaming.
+
+    Devuelve `(Descarga sin contenido, bloques)`: los encabezados de la
+    respuesta y un iterador de bloques de bytes que cierra la conexión al
+    terminar.
+    """
+    respuesta = obtener_sesion().get(url, stream=True, timeout=timeout)
+    respuesta.raise_for_status()
+    descarga = Descarga(
+        etag=respuesta.headers.get("ETag"),
+        ultima_modificacion=respuesta.headers.get("Last-Modified"),
+    )
+
+    def bloques():
+        with respuesta:
+            yield from respuesta.iter_content(tamaño_bloque)
+
+    return descarga, bloques()
+
+
+class FlujoBloques:
+    """Archivo binario de solo lectura sobre un iterador de bloques de bytes.
+
+    El contenido completo hace falta al final (para detectar filas anexadas
+    después), pero no mientras se prepara: los bloques leídos se copian a un
+    archivo temporal (en memoria mientras es pequeño) y la huella se calcula
+    a medida que llegan.
+    """
+
+    def __init__(self, bloques):
+        self._bloques = iter(bloques)
+        self._pendiente = bytearray()
+        self._huella = hashlib.sha1()
+        self._copia = tempfile.SpooledTemporaryFile(BYTES_EN_MEMORIA_POR_PARTES)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self._copia.close()
+
+    def read(self, n=-1):
+        while n < 0 or len(self._pendiente) < n:
+            bloque = next(self._bloques, None)
+            if bloque is None:
+                break
+            self._huella.update(bloque)
+            self._copia.write(bloque)
+            self._pendiente += bloque
+        if n < 0:
+            n = len(self._pendiente)
+        leido = bytes(self._pendiente[:n])
+        del self._pendiente[:n]
+        return leido
+
+    def huella(self):
+        """`calcular_huella` de todos los bytes leídos"""
+        return self._huella.hexdigest()
+
+    def contenido(self):
+        """Todos los bytes leídos"""
+        self._copia.seek(0)
+        return self._copia.read()
+
+
+def filas_anexadas(previo, nuevo):
+    """Bytes agregados al final si `nuevo` es `previo` más filas completas; si no, None"""
+    if len(nuevo) <= len(previo) or not nuevo.startswith(previo):
+        return None
+    resto = nuevo[len(previo):]
+    # El contenido previo debe terminar en un salto de línea (o el resto empezar
+    # con uno); si no, se modificó la última fila en lugar de agregar filas
+    if not previo.endswith(b"\n") and not resto.startswith((b"\r", b"\n")):
+        return None
+    return resto
+
+
+# --------------------------
+# ALMACÉN DE HOJAS CARGADAS
+# --------------------------
+@dataclass
+class EstadoHoja:
+    """Última versión descargada y preparada de una hoja.
+
+    `actualizada` es el momento en que se confirmó por última vez que los
+    datos coinciden con la hoja (descarga o revalidación sin cambios).
+    """
+    clave: tuple
+    url: str
+    contenido: bytes
+    huella: str
+    etag: str
+    ultima_modificacion: str
+    reglas: list
+    hoja: object
+    actualizada: datetime
+    tamaño: int = None
+    expira: float = 0.0
+
+
+def medir_memoria(estado):
+    """Bytes que ocupa una hoja en el almacén (CSV descargado más DataFrames)"""
+    hoja = estado.hoja
+    return (
+        len(estado.contenido)
+        + int(hoja.df.memory_usage(deep=True).sum())
+        + int(hoja.fechas_invalidas.memory_usage(deep=True).sum())
+    )
+
+
+class AlmacenHojas:
+    """Caché acotada de hojas cargadas, indexada por `(sheet_id, gid)`.
+
+    Cada hoja vence `ttl` segundos después de su última descarga o
+    revalidación. Una hoja vencida se sigue sirviendo mientras se revalida en
+    segundo plano con una petición condicional, y la versión nueva reemplaza
+    a la anterior de forma atómica al terminar. Las descargas de una misma
+    hoja se comparten: si varias sesiones la piden a la vez se hace una sola
+    petición. Si la memoria total supera `memoria_maxima` se expulsan las
+    hojas usadas hace más tiempo (LRU), salvo las que alguna sesión está
+    usando (ver `UsoHojas`).
+
+    La revalidación no reprocesa nada si la hoja no cambió, y si solo se
+    agregaron filas al final se preparan solo esas filas y se anexan a la
+    versión guardada.
+
+    Con `directorio_instantaneas` cada versión preparada se escribe también
+    en disco (Arrow IPC). Una hoja que no está en memoria, por ejemplo tras
+    reiniciar el servidor, se restaura desde ahí sin descargar ni volver a
+    procesar, y se revalida en segundo plano como si hubiera vencido.
+
+    Con `instrumentacion` (ver `finanzas.metricas`) se miden las descargas y
+    el preprocesamiento de cada hoja.
+
+    `cargar_por_partes` es la carga inicial en streaming: prepara el CSV por
+    partes a medida que llega, las une a lo ya preparado y entrega lo nuevo a
+    quienes la esperan.
+    """
+
+    def __init__(
+        self, ttl=30 * 60, memoria_maxima=512 * 1024 ** 2, descargar=descargar_csv, trabajadores=8,
+        directorio_instantaneas=None, instrumentacion=None, abrir=abrir_csv,
+    ):
+        self.ttl = ttl
+        self.memoria_maxima = memoria_maxima
+        self.directorio_instantaneas = directorio_instantaneas
+        self.instrumentacion = instrumentacion
+        self._descargar = descargar
+        self._abrir = abrir
+        self._hojas = OrderedDict()
+        self._referencias = Counter()
+        self._en_curso = {}
+        self._hojas_parciales = {}
+        self._candado = threading.Lock()
+        self._ejecutor = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix="hojas")
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self.restauraciones = 0
+
+    def _guardar(self, estado, desde_disco=False):
+        if estado.tamaño is None:
+            # Versión nueva de la hoja (no una simple renovación del TTL)
+            if self.directorio_instantaneas is not None and not desde_disco:
+                guardar_instantanea(self.directorio_instantaneas, estado)
+            estado = replace(estado, tamaño=medir_memoria(estado))
+        # Lo restaurado de disco nace vencido para que se revalide enseguida
+        estado = replace(estado, expira=0.0 if desde_disco else time.monotonic() + self.ttl)
+        with self._candado:
+            self._hojas[estado.clave] = estado
+            self._hojas.move_to_end(estado.clave)
+            # La hoja recién guardada nunca se expulsa, aunque exceda el límite
+            # sola, ni las que usa alguna sesión (seguirían en memoria igual)
+            while self.memoria_usada() > self.memoria_maxima:
+                libre = next(
+                    (clave for clave in self._hojas if clave != estado.clave and not self._referencias[clave]),
+                    None,
+                )
+                if libre is None:
+                    break
+                del self._hojas[libre]
+                self.expulsiones += 1
+        return estado
+
+    def _medir(self, etapa, clave, **opciones):
+        if self.instrumentacion is None:
+            return ETAPA_INACTIVA
+        return self.instrumentacion.etapa(etapa, hoja=etiqueta_hoja(clave), **opciones)
+
+    def _medidor(self, clave):
+        """`medir` para `preparar_hoja` y `preparar_por_partes` con la etiqueta de la hoja"""
+        if self.instrumentacion is None:
+            return sin_medir
+        return lambda etapa, **opciones: self._medir(etapa, clave, **opciones)
+
+    def _descargar_medido(self, clave, url, *condiciones):
+        with self._medir("descarga", clave):
+            return self._descargar(url, *condiciones)
+
+    def _preparar(self, clave, contenido, reglas, **opciones):
+        # "preparacion" incluye la lectura del CSV, las fechas y las categorías,
+        # que se miden también por separado
+        medir = self._medidor(clave)
+        with self._medir("preparacion", clave) as etapa:
+            with medir("lectura_csv") as lectura:
+                data = leer_csv(contenido)
+                lectura.filas_salida = len(data)
+            etapa.filas_entrada = len(data)
+            hoja = preparar_hoja(data, reglas, medir=medir, **opciones)
+            etapa.filas_salida = len(hoja.df)
+        return hoja
+
+    def memoria_usada(self):
+        return sum(estado.tamaño for estado in self._hojas.values())
+
+    def _restaurar(self, clave):
+        """Carga la hoja desde su instantánea en disco, si existe"""
+        if self.directorio_instantaneas is None:
+            return None
+        campos = cargar_instantanea(self.directorio_instantaneas, clave)
+        if campos is None:
+            return None
+        with self._candado:
+            self.restauraciones += 1
+        return self._guardar(EstadoHoja(**campos), desde_disco=True)
+
+    # --------------------------
+    # Referencias de las sesiones
+    # --------------------------
+    def retener(self, claves):
+        with self._candado:
+            self._referencias.update(claves)
+
+    def soltar(self, claves):
+        with self._candado:
+            self._referencias.subtract(claves)
+            for clave in claves:
+                if self._referencias[clave] <= 0:
+                    del self._referencias[clave]
+
+    # --------------------------
+    # Peticiones compartidas (una por hoja a la vez)
+    # --------------------------
+    def _una_vez(self, clave, funcion, *args):
+        """Ejecuta `funcion` en segundo plano o se une a la que ya corre para la misma hoja"""
+        with self._candado:
+            futuro = self._en_curso.get(clave)
+            nuevo = futuro is None
+            if nuevo:
+                futuro = self._ejecutor.submit(funcion, *args)
+                self._en_curso[clave] = futuro
+        if nuevo:
+            futuro.add_done_callback(partial(self._terminar, clave))
+        return futuro
+
+    def _terminar(self, clave, futuro):
+        with self._candado:
+            if self._en_curso.get(clave) is futuro:
+                del self._en_curso[clave]
+                self._hojas_parciales.pop(clave, None)
+        if futuro.exception() is not None:
+            logger.warning("No se pudo actualizar la hoja %s: %s", clave, futuro.exception())
+
+    def en_curso(self, link_hoja):
+        """True si hay una descarga o revalidación de la hoja en curso"""
+        with self._candado:
+            return clave_hoja(link_hoja) in self._en_curso
+
+    # --------------------------
+    # Consulta y actualización
+    # --------------------------
+    def consultar(self, link_hoja):
+        """Versión guardada de la hoja (o None) sin descargar ni contar en las estadísticas"""
+        with self._candado:
+            return self._hojas.get(clave_hoja(link_hoja))
+
+    def obtener(self, link_hoja, reglas):
+        """Versión guardada de la hoja.
+
+        Solo bloquea si la hoja no está en el almacén ni en disco; si ya venció
+        se devuelve la versión anterior y se revalida en segundo plano.
+        """
+        clave = clave_hoja(link_hoja)
+        with self._candado:
+            estado = self._hojas.get(clave)
+            vigente = estado is not None and estado.expira > time.monotonic()
+            if vigente:
+                self.aciertos += 1
+                self._hojas.move_to_end(clave)
+            else:
+                self.fallos += 1
+        if estado is None:
+            estado = self._restaurar(clave)
+            if estado is None:
+                return self.actualizar(link_hoja, reglas)[0]
+        if not vigente:
+            self.actualizar_en_segundo_plano(link_hoja, reglas)
+        if estado.reglas != reglas:
+            # Cambió la tabla de categorías: se reprocesa sin volver a descargar
+            estado = self._guardar(replace(
+                estado, reglas=reglas, tamaño=None,
+                hoja=self._preparar(clave, estado.contenido, reglas),
+            ))
+        return estado
+
+    def obtener_varias(self, links, reglas):
+        """Como `obtener` para varias hojas; las que faltan se cargan en paralelo.
+
+        Cada descarga y su preprocesamiento corren en el pool del almacén, así
+        que el tiempo total es aproximadamente el de la hoja más lenta.
+        """
+        futuros = {
+            i: self.actualizar_en_segundo_plano(link, reglas)
+            for i, link in enumerate(links)
+            if self.consultar(link) is None and self._restaurar(clave_hoja(link)) is None
+        }
+        estados = []
+        for i, link in enumerate(links):
+            if i in futuros:
+                with self._candado:
+                    self.fallos += 1
+                estados.append(futuros[i].result()[0])
+            else:
+                estados.append(self.obtener(link, reglas))
+        return estados
+
+    def cargar_por_partes(self, link_hoja, reglas, avance, filas_por_parte=FILAS_POR_PARTE):
+        """Como `obtener`, pero si hay que descargar la hoja lo hace en streaming.
+
+        La descarga corre en el pool del almacén y `avance(parte)` se llama
+        en el hilo de quien espera con cada `HojaPreparada` parcial, en orden,
+        en cuanto está lista (para mostrar resultados antes de terminar). Si
+        la carga ya estaba en curso (otra sesión, o una ejecución anterior de
+        la misma) primero se entrega en una sola parte todo lo ya preparado,
+        y si quien espera se atrasa recibe juntas las partes que se perdió
+        (ver `filas_desde`). Si `avance`
+        lanza una excepción, por ejemplo porque Streamlit interrumpe la
+        ejecución, solo deja de esperar quien llamó: la carga termina en
+        segundo plano, queda en el almacén y las demás sesiones la reciben.
+
+        Si la hoja ya está en el almacén o en disco, o si se está revalidando,
+        no se llama a `avance` y se devuelve ese estado.
+        """
+        clave = clave_hoja(link_hoja)
+        if self.consultar(link_hoja) is not None or self._restaurar(clave) is not None:
+            return self.obtener(link_hoja, reglas)
+        with self._candado:
+            self.fallos += 1
+            futuro = self._en_curso.get(clave)
+            nuevo = futuro is None
+            if nuevo:
+                futuro = self._ejecutor.submit(
+                    self._cargar_en_streaming, clave, url_exportacion(link_hoja), reglas, filas_por_parte
+                )
+                self._en_curso[clave] = futuro
+        if nuevo:
+            futuro.add_done_callback(partial(self._terminar, clave))
+
+        entregadas, reporte_entregado = 0, {}
+        while True:
+            terminada = futuro.done()
+            # Al terminar, lo que falte se toma de la hoja completa
+            parcial = futuro.result()[0].hoja if terminada else self._hojas_parciales.get(clave)
+            if parcial is not None and parcial.filas_crudas > entregadas:
+                avance(filas_desde(parcial, entregadas, reporte_entregado))
+                entregadas, reporte_entregado = parcial.filas_crudas, parcial.reporte_fechas
+            if terminada:
+                return futuro.result()[0]
+            wait([futuro], timeout=INTERVALO_PARTES_SEGUNDOS)
+
+    def _cargar_en_streaming(self, clave, url, reglas, filas_por_parte):
+        with self._medir("carga_por_partes", clave) as etapa:
+            descarga, bloques = self._abrir(url)
+            with FlujoBloques(bloques) as flujo:
+                # Cada parte se une a lo ya preparado en cuanto llega, que es lo
+                # que ven quienes esperan la carga; así no se guardan las partes
+                hoja = None
+                for parte in preparar_por_partes(flujo, reglas, filas_por_parte, self._medidor(clave)):
+                    hoja = parte if hoja is None else anexar_filas(hoja, parte)
+                    self._hojas_parciales[clave] = hoja
+                contenido = flujo.contenido()
+                huella = flujo.huella()
+            etapa.filas_entrada = hoja.filas_crudas
+            etapa.filas_salida = len(hoja.df)
+        estado = self._guardar(EstadoHoja(
+            clave, url, contenido, huella,
+            descarga.etag, descarga.ultima_modificacion, reglas, hoja, datetime.now(),
+        ))
+        return estado, COMPLETA, len(estado.hoja.df)
+
+    def revalidar_si_vencida(self, link_hoja, reglas):
+        """Inicia la revalidación en segundo plano si la hoja guardada ya venció"""
+        estado = self.consultar(link_hoja)
+        if estado is not None and estado.expira <= time.monotonic():
+            self.actualizar_en_segundo_plano(link_hoja, reglas)
+
+    def actualizar(self, link_hoja, reglas):
+        """Revisa si la hoja cambió y espera. Devuelve `(estado, resultado, filas_nuevas)`"""
+        return self.actualizar_en_segundo_plano(link_hoja, reglas).result()
+
+    def actualizar_en_segundo_plano(self, link_hoja, reglas):
+        """Inicia (o se une a) la revisión de la hoja y devuelve su Future"""
+        clave = clave_hoja(link_hoja)
+        with self._candado:
+            previo = self._hojas.get(clave)
+        if previo is None:
+            return self._una_vez(clave, self._cargar_nueva, clave, url_exportacion(link_hoja), reglas)
+        return self._una_vez(clave, self._revalidar, previo, reglas)
+
+    def _cargar_completa(self, clave, url, descarga, reglas):
+        hoja = self._preparar(clave, descarga.contenido, reglas)
+        return self._guardar(EstadoHoja(
+            clave, url, descarga.contenido, calcular_huella(descarga.contenido),
+            descarga.etag, descarga.ultima_modificacion, reglas, hoja, datetime.now(),
+        ))
+
+    def _cargar_nueva(self, clave, url, reglas):
+        estado = self._cargar_completa(clave, url, self._descargar_medido(clave, url), reglas)
+        return estado, COMPLETA, len(estado.hoja.df)
+
+    def _revalidar(self, previo, reglas):
+        descarga = self._descargar_medido(previo.clave, previo.url, previo.etag, previo.ultima_modificacion)
+        if descarga.no_modificado or calcular_huella(descarga.contenido) == previo.huella:
+            if previo.reglas != reglas:
+                estado = self._guardar(replace(
+                    previo, reglas=reglas, tamaño=None, actualizada=datetime.now(),
+                    hoja=self._preparar(previo.clave, previo.contenido, reglas),
+                ))
+            else:
+                estado = self._guardar(replace(
+                    previo, etag=descarga.etag, ultima_modificacion=descarga.ultima_modificacion,
+                    actualizada=datetime.now(),
+                ))
+            return estado, SIN_CAMBIOS, 0
+
+        resto = filas_anexadas(previo.contenido, descarga.contenido)
+        if resto is None or previo.reglas != reglas:
+            estado = self._cargar_completa(previo.clave, previo.url, descarga, reglas)
+            return estado, COMPLETA, len(estado.hoja.df)
+
+        # Solo se agregaron filas: se preparan con el encabezado original
+        encabezado = previo.contenido.split(b"\n", 1)[0]
+        nuevas = self._preparar(
+            previo.clave,
+            encabezado + b"\n" + resto,
+            reglas,
+            formato_fechas=previo.hoja.formato_fechas,
+            inicio=previo.hoja.filas_crudas,
+        )
+        estado = self._guardar(EstadoHoja(
+            previo.clave, previo.url, descarga.contenido, calcular_huella(descarga.contenido),
+            descarga.etag, descarga.ultima_modificacion, reglas,
+            anexar_filas(previo.hoja, nuevas), datetime.now(),
+        ))
+        return estado, INCREMENTAL, len(nuevas.df)
+
+    def invalidar(self, link_hoja):
+        """Descarta solo esta hoja (también de disco); la próxima consulta la descarga completa"""
+        clave = clave_hoja(link_hoja)
+        if self.directorio_instantaneas is not None:
+            borrar_instantanea(self.directorio_instantaneas, clave)
+        with self._candado:
+            return self._hojas.pop(clave, None) is not None
+
+    def estadisticas(self):
+        with self._candado:
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "expulsiones": self.expulsiones,
+                "restauraciones": self.restauraciones,
+                "hojas": len(self._hojas),
+                "en_uso": sum(1 for clave in self._hojas if self._referencias[clave]),
+                "memoria": self.memoria_usada(),
+            }
+
+
+class UsoHojas:
+    """Hojas del almacén que está usando una sesión (conteo de referencias).
+
+    Mientras una sesión usa una hoja el almacén no la expulsa por memoria:
+    expulsarla no liberaría nada y volver a cargarla dejaría dos copias. Las
+    referencias se sueltan al cambiar de hojas o cuando la sesión se
+    descarta y este objeto se recolecta.
+    """
+
+    def __init__(self, almacen):
+        self._almacen = almacen
+        self._claves = set()
+        weakref.finalize(self, almacen.soltar, self._claves)
+
+    def usar(self, links):
+        claves = {clave_hoja(link) for link in links}
+        if claves != self._claves:
+            self._almacen.retener(claves - self._claves)
+            self._almacen.soltar(self._claves - claves)
+            # Se modifica el mismo conjunto que tiene el finalizador
+            self._claves.clear()
+            self._claves.update(claves)
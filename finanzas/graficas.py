@@ -0,0 +1,163 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from finanzas.muestreo import indices_min_max
+
+# Desde cuántas filas se usa WebGL y cuántos puntos se envían como máximo
+UMBRAL_WEBGL = 1000
+PUNTOS_MAXIMOS_BALANCE = 2000
+PUNTOS_MAXIMOS_DISPERSION = 5000
+LONGITUD_MAXIMA_HOVER = 40
+
+# Columnas de las que dependen `figura_balance` y `figura_dispersion` (el
+# tipo, la cantidad y el balance se derivan de los centavos)
+COLUMNAS_MOVIMIENTOS = ["Fecha", "Centavos", "Ingreso /Egreso", "Concepto"]
+
+
+# --------------------------
+# HUELLA DE LAS ENTRADAS
+# --------------------------
+def huella_figura(*entradas):
+    """Huella de las entradas de una figura, para reusarla si no cambiaron.
+
+    Los DataFrames se resumen por nombre, tipo y valores de cada columna (no
+    por el índice, que las figuras no usan): las numéricas y de fecha por
+    sus bytes, las categóricas por sus códigos y categorías y las demás con
+    `hash_pandas_object`. Cualquier otra entrada (montos, opciones) por su repr.
+    """
+    huella = hashlib.sha1()
+    for entrada in entradas:
+        if isinstance(entrada, pd.DataFrame):
+            for nombre, columna in entrada.items():
+                huella.update(f"{nombre}:{columna.dtype}:{len(columna)}".encode())
+                if isinstance(columna.dtype, pd.CategoricalDtype):
+                    huella.update(repr(columna.cat.categories.tolist()).encode())
+                    valores = columna.cat.codes.to_numpy()
+                elif isinstance(columna.dtype, np.dtype) and columna.dtype.kind in "biufmM":
+                    valores = columna.to_numpy()
+                else:
+                    valores = pd.util.hash_pandas_object(columna, index=False).to_numpy()
+                huella.update(np.ascontiguousarray(valores).view(np.uint8))
+        else:
+            huella.update(repr(entrada).encode())
+        huella.update(b"|")
+    return huella.hexdigest()
+
+
+# --------------------------
+# FIGURAS DEL ANÁLISIS
+# --------------------------
+def figura_ingresos_gastos(total_ingresos, total_gastos):
+    """Pastel de ingresos frente a gastos (montos en pesos)"""
+    df_pie = pd.DataFrame({
+        "Tipo": ["Ingresos", "Gastos"],
+        "Monto": [total_ingresos, abs(total_gastos)]
+    })
+    fig = px.pie(
+        df_pie,
+        names="Tipo",
+        values="Monto",
+        color="Tipo",
+        color_discrete_map={"Ingresos": "#2ECC71", "Gastos": "#E74C3C"},
+        title="💹 Proporción de ingresos y gastos",
+        hole=0.4
+    )
+    fig.update_traces(textinfo='percent+label', pull=[0.05, 0.05])
+    fig.update_layout(template="plotly_dark")
+    return fig
+
+
+def figura_top10_pastel(resumen_gastos):
+    """Pastel del Top 10 de gastos por categoría (de `resumir_movimientos`)"""
+    fig = px.pie(
+        resumen_gastos,
+        names="ConceptoAgrupado",
+        values="Cantidad",
+        title="Top 10 gastos por concepto (click para ver desglose)",
+        color_discrete_sequence=px.colors.sequential.Magma_r,
+        hole=0.4
+    )
+    fig.update_traces(textinfo="percent+label")
+    fig.update_layout(template="plotly_dark")
+    return fig
+
+
+def figura_balance(df_final):
+    """Balance acumulado y su tendencia.
+
+    Con muchos movimientos se dibujan solo el mínimo y el máximo de cada
+    tramo (se conservan picos y valles) y se usa WebGL.
+    """
+    muchos_puntos = len(df_final) > UMBRAL_WEBGL
+    tendencia = df_final["Balance Neto"].rolling(window=5, min_periods=1).mean()
+    posiciones = indices_min_max(df_final["Balance Neto"].to_numpy(), PUNTOS_MAXIMOS_BALANCE // 2)
+    df_balance = df_final[["Fecha", "Balance Neto"]].iloc[posiciones]
+    fig = px.line(
+        df_balance,
+        x="Fecha",
+        y="Balance Neto",
+        title="📈 Balance acumulado en el tiempo",
+        markers=not muchos_puntos,
+        render_mode="webgl" if muchos_puntos else "svg",
+        color_discrete_sequence=["#3498DB"]
+    )
+    agregar_tendencia = fig.add_scattergl if muchos_puntos else fig.add_scatter
+    agregar_tendencia(
+        x=df_balance["Fecha"], y=tendencia.iloc[posiciones],
+        mode="lines", name="Tendencia (suavizada)",
+        line=dict(color="#E67E22", width=3, dash="dot")
+    )
+    fig.update_layout(template="plotly_dark", hovermode="x unified")
+    return fig
+
+
+def figura_dispersion(df_final):
+    """Dispersión de ingresos y gastos con tamaño proporcional al monto.
+
+    Con más de PUNTOS_MAXIMOS_DISPERSION movimientos solo se incluyen los de
+    mayor monto (los pequeños apenas se ven).
+    """
+    muchos_puntos = len(df_final) > UMBRAL_WEBGL
+    df_dispersion = df_final.assign(MontoAbs=df_final["Cantidad"].abs())
+    if len(df_final) > PUNTOS_MAXIMOS_DISPERSION:
+        df_dispersion = df_dispersion.nlargest(PUNTOS_MAXIMOS_DISPERSION, "MontoAbs")
+    df_dispersion = df_dispersion[["Fecha", "MontoAbs", "Tipo", "Ingreso /Egreso", "Cantidad"]].assign(
+        Concepto=df_dispersion["Concepto"].astype(str).str.slice(0, LONGITUD_MAXIMA_HOVER)
+    )
+    fig = px.scatter(
+        df_dispersion,
+        x="Fecha",
+        y="MontoAbs",
+        color="Tipo",
+        size="MontoAbs",
+        color_discrete_map={"Ingreso": "#2ECC71", "Gasto": "#E74C3C"},
+        hover_data=["Concepto", "Cantidad"] if muchos_puntos else ["Concepto", "Ingreso /Egreso", "Cantidad"],
+        render_mode="webgl" if muchos_puntos else "svg",
+        title="🔵 Ingresos y Gastos (tamaño proporcional al monto)"
+    )
+    fig.update_traces(opacity=0.8)
+    fig.update_layout(
+        template="plotly_dark",
+        xaxis_title="Fecha",
+        yaxis_title="Monto ($)"
+    )
+    return fig
+
+
+def figura_top10_barras(resumen_gastos):
+    """Barras horizontales del Top 10 de gastos por categoría"""
+    fig = px.bar(
+        resumen_gastos,
+        x="Cantidad",
+        y="ConceptoAgrupado",
+        orientation="h",
+        text="Cantidad",
+        color="Cantidad",
+        color_continuous_scale=px.colors.sequential.Magma_r,
+        title="Top 10 gastos filtrados (click para ver desglose)",
+    )
+    fig.update_layout(template="plotly_dark", yaxis={'categoryorder':'total ascending'})
+    return fig
@@ -0,0 +1,244 @@
+import io
+from dataclasses import dataclass, field, replace
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from finanzas.categorias import ClasificadorCategorias
+from finanzas.fechas import inferir_formato_fecha, parsear_fechas
+from finanzas.metricas import sin_medir
+from finanzas.texto import normalizar_columna
+
+COLUMNAS_REQUERIDAS = {"Fecha", "Cantidad", "Ingreso /Egreso", "Concepto"}
+
+MESES_DICT = {
+    1: "Enero", 2: "Febrero", 3: "Marzo", 4: "Abril",
+    5: "Mayo", 6: "Junio", 7: "Julio", 8: "Agosto",
+    9: "Septiembre", 10: "Octubre", 11: "Noviembre", 12: "Diciembre"
+}
+
+# Columnas que agrega el preprocesamiento y no vienen de la hoja
+COLUMNAS_INTERNAS = ["Centavos", "ConceptoNormalizado", "ConceptoAgrupado"]
+
+# Lectura por partes: filas de CSV que se leen y preparan a la vez
+FILAS_POR_PARTE = 50_000
+
+# Columnas que se leen siempre como texto: si no, `read_csv` infiere el tipo
+# de cada parte por separado (una parte sin ningún valor en Ingreso /Egreso
+# queda como float, una de conceptos solo numéricos como int)
+TIPOS_TEXTO = {"Fecha": str, "Ingreso /Egreso": str, "Concepto": str}
+
+
+class ColumnasFaltantes(ValueError):
+    """La hoja no contiene las columnas Fecha, Cantidad, Ingreso /Egreso y Concepto"""
+
+
+@dataclass
+class HojaPreparada:
+    """Resultado del preprocesamiento de una hoja.
+
+    `df` está ordenado por `Fecha` (orden estable: los movimientos de un
+    mismo día conservan su orden en la hoja) y su índice es el número de fila
+    cruda.
+    `formato_fechas` y `filas_crudas` permiten preparar después solo las filas
+    agregadas al final de la hoja y anexarlas con `anexar_filas`.
+    """
+    df: pd.DataFrame
+    fechas_invalidas: pd.DataFrame
+    reporte_fechas: dict = field(default_factory=dict)
+    formato_fechas: str = "mixed"
+    filas_crudas: int = 0
+
+
+# --------------------------
+# LECTURA Y PREPROCESAMIENTO
+# --------------------------
+def leer_csv(contenido):
+    """Lee el CSV exportado (bytes) como DataFrame crudo"""
+    return pd.read_csv(io.BytesIO(contenido), dtype=TIPOS_TEXTO)
+
+
+def preparar_por_partes(archivo, reglas, filas_por_parte=FILAS_POR_PARTE, medir=sin_medir):
+    """Lee el CSV de `archivo` por partes y genera cada parte ya preparada.
+
+    Solo hay una parte cruda en memoria a la vez. El formato de fechas se
+    infiere en la primera parte (como lo haría la hoja completa) y los
+    índices siguen el número de fila cruda, así que `unir_partes` da el
+    mismo resultado que `preparar_hoja` sobre todo el archivo.
+
+    `medir` es como en `preparar_hoja`; la etapa "lectura_csv" de cada parte
+    incluye la espera de los bytes que aún no llegan de `archivo`.
+    """
+    formato_fechas = None
+    inicio = 0
+    lector = pd.read_csv(archivo, chunksize=filas_por_parte, dtype=TIPOS_TEXTO)
+    while True:
+        with medir("lectura_csv") as etapa:
+            data = next(lector, None)
+            etapa.filas_salida = None if data is None else len(data)
+        if data is None:
+            break
+        parte = preparar_hoja(data, reglas, formato_fechas, inicio, medir)
+        formato_fechas = parte.formato_fechas
+        inicio = parte.filas_crudas
+        yield parte
+
+
+def categorica_texto(serie):
+    """Columna categórica con categorías de texto.
+
+    Las partes y hojas preparadas solo se pueden unir (`concatenar`) si sus
+    categóricas tienen categorías del mismo tipo, aunque la columna cruda
+    llegue como número.
+    """
+    categorica = serie.astype("category")
+    return categorica.cat.rename_categories(categorica.cat.categories.astype(str))
+
+
+def ordenar_por_fecha(df):
+    """Ordena por `Fecha` de forma estable (sin copiar si ya está ordenado)"""
+    if df["Fecha"].is_monotonic_increasing:
+        return df
+    return df.sort_values("Fecha", kind="stable")
+
+
+def preparar_hoja(data, reglas, formato_fechas=None, inicio=0, medir=sin_medir):
+    """Convierte la hoja cruda en el DataFrame limpio y tipado.
+
+    Esquema compacto: las cantidades se guardan como centavos en int64
+    (columna `Centavos`, sumas exactas), los textos repetitivos como
+    categóricas y `MesNombre` como códigos de mes sobre 12 categorías.
+
+    `inicio` es el número de fila cruda de la primera fila de `data` (para
+    conservar índices consecutivos al anexar filas nuevas).
+    `medir(etapa, filas_entrada=None)` devuelve el contexto que mide cada
+    etapa (ver `Instrumentacion.etapa`): "fechas" y "categorias".
+    """
+    if not COLUMNAS_REQUERIDAS.issubset(data.columns):
+        raise ColumnasFaltantes(", ".join(sorted(COLUMNAS_REQUERIDAS - set(data.columns))))
+
+    df = data.copy(deep=False)
+    df.index = pd.RangeIndex(inicio, inicio + len(df))
+
+    # Normalización de fechas: dayfirst=True y, para lo que falle, DD-MM-YY /
+    # DD/MM/YY interpretando YY como 20YY (parseo vectorizado por valor único)
+    with medir("fechas", filas_entrada=len(df)):
+        if formato_fechas is None:
+            formato_fechas = inferir_formato_fecha(df["Fecha"])
+        df["Fecha"], reporte_fechas = parsear_fechas(df["Fecha"], formato_fechas)
+
+    # Filas que aún tienen fechas inválidas (se reportan en la interfaz)
+    fechas_invalidas = df[df["Fecha"].isna()]
+
+    df["Cantidad"] = df["Cantidad"].astype(str).str.replace(",", ".").astype(float)
+    df.dropna(subset=["Fecha", "Cantidad"], inplace=True)
+    df.insert(df.columns.get_loc("Cantidad"), "Centavos", (df["Cantidad"] * 100).round().astype("int64"))
+    df.drop(columns=["Cantidad"], inplace=True)
+
+    df["MesNombre"] = pd.Categorical.from_codes(
+        df["Fecha"].dt.month.to_numpy() - 1, categories=list(MESES_DICT.values())
+    )
+
+    # Concepto sin tildes y en minúsculas, calculado una vez por valor único
+    df["ConceptoNormalizado"] = normalizar_columna(df["Concepto"])
+
+    # Categoría agrupada (OXXO, Supermercado, ...) según la tabla de reglas
+    with medir("categorias", filas_entrada=len(df)):
+        df["ConceptoAgrupado"] = ClasificadorCategorias(reglas).clasificar(df["Concepto"])
+
+    df["Concepto"] = categorica_texto(df["Concepto"])
+    df["Ingreso /Egreso"] = categorica_texto(df["Ingreso /Egreso"])
+
+    return HojaPreparada(ordenar_por_fecha(df), fechas_invalidas, reporte_fechas, formato_fechas, inicio + len(data))
+
+
+def vista_sesion(hoja):
+    """Copia propia de una hoja compartida, sin copiar los datos.
+
+    Las hojas del almacén son de solo lectura y las usan todas las sesiones.
+    La copia superficial comparte los bloques con la original y, por
+    copy-on-write, solo se copia una columna si la sesión la modifica.
+    """
+    return replace(hoja, df=hoja.df.copy(deep=False), fechas_invalidas=hoja.fechas_invalidas.copy(deep=False))
+
+
+def vista_registros(df):
+    """Registros con las columnas de la hoja (Cantidad en pesos) para mostrarlos"""
+    vista = df.drop(columns=COLUMNAS_INTERNAS)
+    vista.insert(df.columns.get_loc("Centavos"), "Cantidad", df["Centavos"] / 100)
+    return vista
+
+
+# --------------------------
+# UNIÓN DE HOJAS PREPARADAS
+# --------------------------
+def concatenar(partes):
+    """Concatena DataFrames conservando como categóricas las columnas que lo son en todas las partes"""
+    partes = list(partes)
+    resultado = pd.concat(partes)
+    for columna in partes[0].columns:
+        if all(isinstance(p[columna].dtype, pd.CategoricalDtype) for p in partes):
+            resultado[columna] = pd.Series(
+                union_categoricals([p[columna] for p in partes]),
+                index=resultado.index,
+            )
+    return resultado
+
+
+def unir_partes(partes):
+    """Une hojas preparadas consecutivas (partes de una misma hoja, en orden)"""
+    reporte = {}
+    for parte in partes:
+        for formato, filas in parte.reporte_fechas.items():
+            reporte[formato] = reporte.get(formato, 0) + filas
+    return HojaPreparada(
+        df=ordenar_por_fecha(concatenar(parte.df for parte in partes)),
+        fechas_invalidas=pd.concat([parte.fechas_invalidas for parte in partes]),
+        reporte_fechas=reporte,
+        formato_fechas=partes[0].formato_fechas,
+        filas_crudas=partes[-1].filas_crudas,
+    )
+
+
+def anexar_filas(previa, nueva):
+    """Une una hoja preparada con las filas nuevas preparadas a continuación"""
+    return unir_partes([previa, nueva])
+
+
+def filas_desde(hoja, inicio, reporte_previo):
+    """Las filas de `hoja` desde la fila cruda `inicio`, como una parte aparte.
+
+    `reporte_previo` es el reporte de fechas de las filas anteriores, que se
+    descuenta del de `hoja`.
+    """
+    reporte = {}
+    for formato, filas in hoja.reporte_fechas.items():
+        if filas > reporte_previo.get(formato, 0):
+            reporte[formato] = filas - reporte_previo.get(formato, 0)
+    return HojaPreparada(
+        df=hoja.df[hoja.df.index >= inicio],
+        fechas_invalidas=hoja.fechas_invalidas[hoja.fechas_invalidas.index >= inicio],
+        reporte_fechas=reporte,
+        formato_fechas=hoja.formato_fechas,
+        filas_crudas=hoja.filas_crudas,
+    )
+
+
+def combinar_hojas(hojas, nombres):
+    """Une varias hojas preparadas en un solo libro con una columna `Origen`"""
+    partes = []
+    invalidas = []
+    reporte = {}
+    for hoja, nombre in zip(hojas, nombres):
+        origen = pd.Categorical([nombre] * len(hoja.df), categories=list(dict.fromkeys(nombres)))
+        partes.append(hoja.df.assign(Origen=origen))
+        invalidas.append(hoja.fechas_invalidas.assign(Origen=nombre))
+        for formato, filas in hoja.reporte_fechas.items():
+            reporte[formato] = reporte.get(formato, 0) + filas
+    df = ordenar_por_fecha(concatenar(partes)).reset_index(drop=True)
+    return HojaPreparada(
+        df=df,
+        fechas_invalidas=pd.concat(invalidas, ignore_index=True),
+        reporte_fechas=reporte,
+        filas_crudas=sum(hoja.filas_crudas for hoja in hojas),
+    )
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow as pa
+
+from finanzas.ingesta import HojaPreparada
+
+logger = logging.getLogger(__name__)
+
+# Se incrementa cuando cambia la forma de las hojas preparadas, para no
+# restaurar instantáneas escritas por una versión anterior
+VERSION_INSTANTANEA = 3
+
+# --------------------------
+# INSTANTÁNEAS EN DISCO (ARROW IPC)
+# --------------------------
+# Cada hoja se guarda como:
+#   <base>.json                metadatos (huella, ETag, reglas, ...); se escribe al final
+#   <base>-<huella>.csv        CSV descargado (para detectar filas anexadas)
+#   <base>-<huella>.arrow      DataFrame preparado
+#   <base>-<huella>.inv.arrow  filas con fechas inválidas
+# Los nombres de los datos llevan la huella, así el .json nunca apunta a
+# archivos de otra versión aunque dos procesos escriban a la vez.
+
+
+def _base(directorio, clave):
+    return Path(directorio) / hashlib.sha1("|".join(clave).encode("utf-8")).hexdigest()[:16]
+
+
+def _escribir_atomico(ruta, escribir):
+    temporal = ruta.with_name(ruta.name + f".{os.getpid()}.tmp")
+    escribir(temporal)
+    os.replace(temporal, ruta)
+
+
+def _escribir_arrow(df, ruta):
+    tabla = pa.Table.from_pandas(df, preserve_index=None)
+
+    def escribir(destino):
+        with pa.OSFile(str(destino), "wb") as archivo, pa.ipc.new_file(archivo, tabla.schema) as escritor:
+            escritor.write_table(tabla)
+
+    _escribir_atomico(ruta, escribir)
+
+
+def _leer_arrow(ruta):
+    """Lee un archivo Arrow IPC mapeado en memoria (sin copia para columnas numéricas)"""
+    with pa.memory_map(str(ruta), "r") as fuente:
+        return pa.ipc.open_file(fuente).read_all().to_pandas(split_blocks=True)
+
+
+def guardar_instantanea(directorio, estado):
+    """Escribe la hoja preparada y sus metadatos. Devuelve False si no se pudo"""
+    base = _base(directorio, estado.clave)
+    prefijo = f"{base.name}-{estado.huella[:16]}"
+    try:
+        base.parent.mkdir(parents=True, exist_ok=True)
+        _escribir_atomico(base.parent / f"{prefijo}.csv", lambda destino: destino.write_bytes(estado.contenido))
+        _escribir_arrow(estado.hoja.df, base.parent / f"{prefijo}.arrow")
+        _escribir_arrow(estado.hoja.fechas_invalidas, base.parent / f"{prefijo}.inv.arrow")
+        metadatos = {
+            "version": VERSION_INSTANTANEA,
+            "clave": list(estado.clave),
+            "url": estado.url,
+            "huella": estado.huella,
+            "etag": estado.etag,
+            "ultima_modificacion": estado.ultima_modificacion,
+            "reglas": estado.reglas,
+            "actualizada": estado.actualizada.isoformat(),
+            "prefijo": prefijo,
+            "reporte_fechas": estado.hoja.reporte_fechas,
+            "formato_fechas": estado.hoja.formato_fechas,
+            "filas_crudas": estado.hoja.filas_crudas,
+        }
+        _escribir_atomico(
+            base.with_suffix(".json"),
+            lambda destino: destino.write_text(json.dumps(metadatos, ensure_ascii=False), encoding="utf-8"),
+        )
+    except (OSError, pa.ArrowException) as e:
+        logger.warning("No se pudo guardar la instantánea de %s: %s", estado.clave, e)
+        return False
+
+    # Versiones anteriores de la misma hoja
+    for ruta in base.parent.glob(f"{base.name}-*"):
+        if not ruta.name.startswith(prefijo):
+            ruta.unlink(missing_ok=True)
+    return True
+
+
+def cargar_instantanea(directorio, clave):
+    """Campos de `EstadoHoja` leídos de disco, o None si no hay instantánea válida"""
+    base = _base(directorio, clave)
+    try:
+        metadatos = json.loads(base.with_suffix(".json").read_text(encoding="utf-8"))
+        if metadatos.get("version") != VERSION_INSTANTANEA:
+            return None
+        prefijo = base.parent / metadatos["prefijo"]
+        hoja = HojaPreparada(
+            df=_leer_arrow(prefijo.with_name(prefijo.name + ".arrow")),
+            fechas_invalidas=_leer_arrow(prefijo.with_name(prefijo.name + ".inv.arrow")),
+            reporte_fechas=metadatos["reporte_fechas"],
+            formato_fechas=metadatos["formato_fechas"],
+            filas_crudas=metadatos["filas_crudas"],
+        )
+        contenido = prefijo.with_name(prefijo.name + ".csv").read_bytes()
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, pa.ArrowException) as e:
+        logger.warning("Instantánea ilegible para %s: %s", clave, e)
+        return None
+    return {
+        "clave": tuple(metadatos["clave"]),
+        "url": metadatos["url"],
+        "contenido": contenido,
+        "huella": metadatos["huella"],
+        "etag": metadatos["etag"],
+        "ultima_modificacion": metadatos["ultima_modificacion"],
+        "reglas": metadatos["reglas"],
+        "hoja": hoja,
+        "actualizada": datetime.fromisoformat(metadatos["actualizada"]),
+    }
+
+
+def borrar_instantanea(directorio, clave):
+    base = _base(directorio, clave)
+    base.with_suffix(".json").unlink(missing_ok=True)
+    for ruta in base.parent.glob(f"{base.name}-*"):
+        ruta.unlink(missing_ok=True)
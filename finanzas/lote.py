@@ -0,0 +1,230 @@
+"""Reportes por lote sin interfaz: resúmenes mensuales y figuras de muchos libros.
+
+Procesa enlaces de Google Sheets o CSV locales en paralelo (un proceso por
+libro a la vez) con el mismo flujo que la interfaz: preparación de la hoja
+(fechas, montos y categorías), `filtrar_datos`, balance, métricas y las
+mismas figuras de Plotly. Uso (desde la raíz del repositorio):
+
+    python -m finanzas.lote libro.csv https://docs.google.com/spreadsheets/d/... --salida reportes
+    python -m finanzas.lote @libros.txt --año 2024 --procesos 8
+
+Con `@archivo` se leen las entradas de un archivo (una por línea). Cada libro
+deja en `<salida>/<nombre>/` sus tablas en CSV, sus figuras (HTML; PNG, SVG o
+PDF si está instalado kaleido) y `reporte.json`, que se escribe al final y
+guarda la huella de la entrada. Un libro cuya huella (contenido, reglas de
+categorías, filtros y formato) no cambió desde el último reporte se omite;
+los enlaces sí se descargan para calcularla.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+from pathlib import Path
+
+from finanzas.agregados import agregar_balance, gastos_mensuales_por_categoria, resumen_mensual, resumir_movimientos
+from finanzas.categorias import cargar_reglas
+from finanzas.filtros import NUMERO_MES, filtrar_datos
+from finanzas.fuentes import calcular_huella, clave_hoja, descargar_csv, etiqueta_hoja, url_exportacion
+from finanzas.graficas import (
+    figura_balance,
+    figura_dispersion,
+    figura_ingresos_gastos,
+    figura_top10_barras,
+    figura_top10_pastel,
+)
+from finanzas.ingesta import ColumnasFaltantes, leer_csv, preparar_hoja
+
+# Se incrementa cuando cambia lo que se escribe en cada reporte
+VERSION_REPORTE = 1
+
+GENERADO = "generado"
+SIN_CAMBIOS = "sin_cambios"
+
+
+# --------------------------
+# ENTRADAS
+# --------------------------
+def es_enlace(entrada):
+    return entrada.startswith(("http://", "https://"))
+
+
+def nombre_reporte(entrada):
+    """Nombre de la carpeta del reporte: el del archivo o `sheet_id-gid` del enlace"""
+    nombre = etiqueta_hoja(clave_hoja(entrada)).replace("#", "-") if es_enlace(entrada) else Path(entrada).stem
+    return re.sub(r"[^\w.-]", "_", nombre)
+
+
+def leer_entrada(entrada):
+    """Contenido CSV (bytes) de un enlace de Google Sheets o de un archivo local"""
+    if es_enlace(entrada):
+        return descargar_csv(url_exportacion(entrada)).contenido
+    return Path(entrada).read_bytes()
+
+
+# --------------------------
+# REPORTE DE UN LIBRO
+# --------------------------
+def escribir_figura(fig, ruta, formato):
+    """Guarda la figura como HTML (Plotly desde CDN) o como imagen estática con kaleido"""
+    if formato == "html":
+        fig.write_html(ruta, include_plotlyjs="cdn")
+    else:
+        fig.write_image(ruta)
+
+
+def generar_reporte(entrada, directorio, reglas, filtros, formato="html", forzar=False):
+    """Escribe el reporte de un libro en `directorio` y devuelve un resumen de lo hecho.
+
+    `filtros` es `(start_date, end_date, razon, excluir, mes, año)` como en la
+    barra de filtros. Corre en un proceso del pool: recibe y devuelve solo
+    valores que se pueden serializar.
+    """
+    inicio = time.perf_counter()
+    directorio = Path(directorio)
+    contenido = leer_entrada(entrada)
+    configuracion = json.dumps(
+        {"reglas": reglas, "filtros": filtros, "formato": formato, "version": VERSION_REPORTE},
+        sort_keys=True, default=str,
+    )
+    huella = calcular_huella(contenido + configuracion.encode("utf-8"))
+
+    ruta_reporte = directorio / "reporte.json"
+    previo = json.loads(ruta_reporte.read_text(encoding="utf-8")) if ruta_reporte.exists() else {}
+    completo = all((directorio / archivo).exists() for archivo in previo.get("archivos", []))
+    if not forzar and previo.get("huella") == huella and completo:
+        return {"entrada": entrada, "estado": SIN_CAMBIOS, "segundos": time.perf_counter() - inicio}
+
+    hoja = preparar_hoja(leer_csv(contenido), reglas)
+    df_final = agregar_balance(filtrar_datos(hoja.df, *filtros))
+    centavos_ingresos, centavos_gastos, resumen_gastos = resumir_movimientos(df_final)
+    total_ingresos, total_gastos = centavos_ingresos / 100, centavos_gastos / 100
+
+    directorio.mkdir(parents=True, exist_ok=True)
+    tablas = {
+        "resumen_mensual.csv": resumen_mensual(df_final),
+        "gastos_por_categoria.csv": gastos_mensuales_por_categoria(df_final),
+        "top_gastos.csv": resumen_gastos[["ConceptoAgrupado", "Cantidad"]],
+    }
+    for archivo, tabla in tablas.items():
+        tabla.to_csv(directorio / archivo, index=False)
+
+    # Las mismas figuras que muestra la interfaz cuando hay datos para ellas
+    figuras = {}
+    if total_ingresos != 0 or total_gastos != 0:
+        figuras["ingresos_gastos"] = lambda: figura_ingresos_gastos(total_ingresos, total_gastos)
+    if not resumen_gastos.empty:
+        figuras["top10_pastel"] = lambda: figura_top10_pastel(resumen_gastos)
+        figuras["top10_barras"] = lambda: figura_top10_barras(resumen_gastos)
+    if not df_final.empty:
+        figuras["balance"] = lambda: figura_balance(df_final)
+        figuras["dispersion"] = lambda: figura_dispersion(df_final)
+    archivos_figuras = []
+    for nombre, construir in figuras.items():
+        archivo = f"{nombre}.{formato}"
+        escribir_figura(construir(), directorio / archivo, formato)
+        archivos_figuras.append(archivo)
+    archivos = list(tablas) + archivos_figuras
+
+    # Lo que dejó el reporte anterior y esta vez no se genera (una figura que
+    # se quedó sin datos, otro formato) se borra antes de escribir reporte.json:
+    # si el proceso se interrumpe aquí, el reporte anterior queda incompleto y
+    # el libro se rehace
+    for archivo in set(previo.get("archivos", [])) - set(archivos):
+        (directorio / archivo).unlink(missing_ok=True)
+
+    reporte = {
+        "huella": huella,
+        "entrada": entrada,
+        "generado": datetime.now().isoformat(timespec="seconds"),
+        "filas": len(hoja.df),
+        "filas_filtradas": len(df_final),
+        "fechas_invalidas": len(hoja.fechas_invalidas),
+        "ingresos": total_ingresos,
+        "gastos": total_gastos,
+        "balance": (centavos_ingresos + centavos_gastos) / 100,
+        "archivos": archivos,
+    }
+    # reporte.json al final: si el proceso se interrumpe, el libro se rehace
+    temporal = ruta_reporte.with_name(f"reporte.json.{os.getpid()}.tmp")
+    temporal.write_text(json.dumps(reporte, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(temporal, ruta_reporte)
+    return {
+        "entrada": entrada,
+        "estado": GENERADO,
+        "filas": len(df_final),
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+# --------------------------
+# LÍNEA DE COMANDOS
+# --------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0], fromfile_prefix_chars="@")
+    parser.add_argument("entradas", nargs="+", help="enlaces de Google Sheets o archivos CSV")
+    parser.add_argument("--salida", default="reportes", help="carpeta de los reportes")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count(), help="procesos en paralelo")
+    parser.add_argument("--formato", choices=["html", "png", "svg", "pdf"], default="html")
+    parser.add_argument("--forzar", action="store_true", help="regenerar aunque la entrada no haya cambiado")
+    parser.add_argument("--desde", type=date.fromisoformat, help="fecha inicial (AAAA-MM-DD)")
+    parser.add_argument("--hasta", type=date.fromisoformat, help="fecha final (AAAA-MM-DD)")
+    parser.add_argument("--mes", choices=["Todos"] + list(NUMERO_MES), default="Todos")
+    parser.add_argument("--año", default="Todos")
+    parser.add_argument("--razon", default="", help="solo conceptos que contengan este texto")
+    parser.add_argument("--excluir", default="", help="excluir conceptos con estas palabras (separadas por comas)")
+    args = parser.parse_args(argv)
+    if args.formato != "html":
+        if importlib.util.find_spec("kaleido") is None:
+            parser.error(f"--formato {args.formato} requiere kaleido (pip install kaleido)")
+
+    # Carpetas sin repetir aunque dos entradas tengan el mismo nombre
+    nombres = {}
+    directorios = {}
+    for entrada in dict.fromkeys(args.entradas):
+        nombre = nombre_reporte(entrada)
+        nombres[nombre] = nombres.get(nombre, 0) + 1
+        directorios[entrada] = Path(args.salida) / (nombre if nombres[nombre] == 1 else f"{nombre}-{nombres[nombre]}")
+
+    reglas = cargar_reglas()
+    filtros = (args.desde, args.hasta, args.razon, args.excluir, args.mes, args.año)
+    conteo = {GENERADO: 0, SIN_CAMBIOS: 0, "errores": 0}
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.procesos) as ejecutor:
+        futuros = {
+            ejecutor.submit(generar_reporte, entrada, directorio, reglas, filtros, args.formato, args.forzar): entrada
+            for entrada, directorio in directorios.items()
+        }
+        for i, futuro in enumerate(as_completed(futuros), start=1):
+            entrada = futuros[futuro]
+            avance = f"[{i}/{len(futuros)}] {directorios[entrada].name}"
+            try:
+                resultado = futuro.result()
+            except ColumnasFaltantes as e:
+                conteo["errores"] += 1
+                print(f"{avance}: ❌ faltan las columnas {e}", flush=True)
+                continue
+            except Exception as e:
+                conteo["errores"] += 1
+                print(f"{avance}: ❌ {e}", flush=True)
+                continue
+            conteo[resultado["estado"]] += 1
+            if resultado["estado"] == SIN_CAMBIOS:
+                print(f"{avance}: ⏭️ sin cambios", flush=True)
+            else:
+                print(f"{avance}: ✅ {resultado['filas']:,} movimientos en {resultado['segundos']:.1f} s", flush=True)
+
+    print(
+        f"Listo en {time.perf_counter() - inicio:.1f} s: {conteo[GENERADO]} generado(s), "
+        f"{conteo[SIN_CAMBIOS]} sin cambios, {conteo['errores']} con error. Reportes en {args.salida}/",
+        flush=True,
+    )
+    return 1 if conteo["errores"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+
+logger = logging.getLogger(__name__)
+
+# Límites (segundos) de las cubetas de los histogramas de latencia
+LIMITES_HISTOGRAMA = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def memoria_residente():
+    """Memoria residente del proceso en bytes (None si no se puede leer)"""
+    try:
+        with open("/proc/self/statm") as archivo:
+            return int(archivo.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def registrar_en_consola(nivel=logging.INFO):
+    """Escribe en stderr una línea JSON por etapa medida.
+
+    Streamlit solo configura sus propios loggers: sin un manejador, los
+    registros de nivel INFO de este módulo no se ven. Si la aplicación ya le
+    configuró uno, no se agrega otro.
+    """
+    if not logger.handlers:
+        manejador = logging.StreamHandler()
+        manejador.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(manejador)
+        # Sin pasar también por la raíz, por si alguien la configura después
+        logger.propagate = False
+    logger.setLevel(nivel)
+
+
+# --------------------------
+# MEDICIÓN POR ETAPA
+# --------------------------
+@dataclass
+class Medicion:
+    etapa: str
+    hoja: str
+    segundos: float
+    filas_entrada: int = None
+    filas_salida: int = None
+    memoria_delta: int = None
+
+
+class _EtapaInactiva:
+    """Contexto que no mide nada; es el que se usa con la instrumentación apagada"""
+
+    filas_salida = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+    def __setattr__(self, nombre, valor):
+        # `etapa.filas_salida = n` se ignora para no compartir estado entre llamadas
+        pass
+
+
+ETAPA_INACTIVA = _EtapaInactiva()
+
+
+def sin_medir(etapa, **opciones):
+    """`medir` por defecto de las funciones que aceptan uno: no mide nada"""
+    return ETAPA_INACTIVA
+
+
+class _Etapa:
+    __slots__ = ("_instrumentacion", "_registro", "etapa", "hoja", "filas_entrada", "filas_salida", "_inicio", "_memoria")
+
+    def __init__(self, instrumentacion, etapa, hoja, filas_entrada, registro):
+        self._instrumentacion = instrumentacion
+        self._registro = registro
+        self.etapa = etapa
+        self.hoja = hoja
+        self.filas_entrada = filas_entrada
+        self.filas_salida = None
+
+    def __enter__(self):
+        self._memoria = memoria_residente()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        segundos = time.perf_counter() - self._inicio
+        memoria = memoria_residente()
+        medicion = Medicion(
+            self.etapa, self.hoja, segundos, self.filas_entrada, self.filas_salida,
+            None if memoria is None or self._memoria is None else memoria - self._memoria,
+        )
+        self._instrumentacion.registrar(medicion)
+        if self._registro is not None:
+            self._registro.append(medicion)
+        return False
+
+
+class Instrumentacion:
+    """Tiempos, filas y memoria de cada etapa, con histogramas por etapa y hoja.
+
+    Es segura entre hilos (las descargas miden desde el pool del almacén).
+    `activa` es el valor por defecto; cada llamada a `etapa` puede
+    encenderla solo para sí (por ejemplo, el panel de depuración de una
+    sesión). Apagada, `etapa` devuelve un contexto vacío compartido.
+    """
+
+    def __init__(self, activa=False, limites=LIMITES_HISTOGRAMA, recientes=200):
+        self.activa = activa
+        self.limites = limites
+        self._candado = threading.Lock()
+        # (etapa, hoja) -> [conteos por cubeta..., +Inf], suma, total, filas de salida
+        self._histogramas = {}
+        self.recientes = deque(maxlen=recientes)
+
+    def etapa(self, nombre, hoja="", filas_entrada=None, registro=None, activa=None):
+        """Contexto que mide una etapa; asignar `filas_salida` al objeto devuelto"""
+        if not (self.activa if activa is None else activa):
+            return ETAPA_INACTIVA
+        return _Etapa(self, nombre, hoja, filas_entrada, registro)
+
+    def registrar(self, medicion):
+        with self._candado:
+            histograma = self._histogramas.get((medicion.etapa, medicion.hoja))
+            if histograma is None:
+                histograma = {"cubetas": [0] * (len(self.limites) + 1), "suma": 0.0, "total": 0, "filas": 0}
+                self._histogramas[(medicion.etapa, medicion.hoja)] = histograma
+            cubeta = next((i for i, limite in enumerate(self.limites) if medicion.segundos <= limite), len(self.limites))
+            histograma["cubetas"][cubeta] += 1
+            histograma["suma"] += medicion.segundos
+            histograma["total"] += 1
+            histograma["filas"] += medicion.filas_salida or 0
+            self.recientes.append(medicion)
+        logger.info(json.dumps({"evento": "etapa", **asdict(medicion)}, ensure_ascii=False))
+
+    def resumen(self):
+        """Total de mediciones y tiempo medio por etapa y hoja"""
+        with self._candado:
+            return [
+                {"etapa": etapa, "hoja": hoja, "mediciones": h["total"], "media_ms": 1000 * h["suma"] / h["total"]}
+                for (etapa, hoja), h in sorted(self._histogramas.items())
+            ]
+
+    # --------------------------
+    # Exportación en formato de texto de Prometheus
+    # --------------------------
+    def exportar_prometheus(self):
+        lineas = [
+            "# HELP finanzas_etapa_segundos Duración de cada etapa del análisis.",
+            "# TYPE finanzas_etapa_segundos histogram",
+        ]
+        filas = [
+            "# HELP finanzas_etapa_filas_total Filas producidas por cada etapa.",
+            "# TYPE finanzas_etapa_filas_total counter",
+        ]
+        with self._candado:
+            for (etapa, hoja), h in sorted(self._histogramas.items()):
+                etiquetas = f'etapa="{_escapar(etapa)}",hoja="{_escapar(hoja)}"'
+                acumulado = 0
+                for limite, conteo in zip(self.limites, h["cubetas"]):
+                    acumulado += conteo
+                    lineas.append(f'finanzas_etapa_segundos_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+                lineas.append(f'finanzas_etapa_segundos_bucket{{{etiquetas},le="+Inf"}} {h["total"]}')
+                lineas.append(f"finanzas_etapa_segundos_sum{{{etiquetas}}} {h['suma']:.6f}")
+                lineas.append(f"finanzas_etapa_segundos_count{{{etiquetas}}} {h['total']}")
+                filas.append(f"finanzas_etapa_filas_total{{{etiquetas}}} {h['filas']}")
+        return "\n".join(lineas + filas) + "\n"
+
+    def escribir_prometheus(self, ruta):
+        """Escribe la exportación de forma atómica (p. ej. para el textfile collector de node_exporter)"""
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            archivo.write(self.exportar_prometheus())
+        os.replace(temporal, ruta)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from finanzas.filtros import NUMERO_MES, separar_palabras
+from finanzas.texto import normalizar_texto
+
+try:
+    import duckdb
+except ImportError:  # dependencia opcional: sin ella se usa solo pandas
+    duckdb = None
+
+
+def duckdb_disponible():
+    return duckdb is not None
+
+
+# --------------------------
+# MOTOR DE CONSULTAS DUCKDB
+# --------------------------
+class MotorDuckDB:
+    """Libro cargado en DuckDB para filtrar y agregar con consultas vectorizadas en paralelo.
+
+    Equivale a `filtrar_datos`, `resumir_movimientos` y `desglose_por_concepto`
+    de pandas y da exactamente los mismos resultados (mismas filas, orden,
+    índices y tipos). El libro se copia (vía Arrow) a una tabla de DuckDB
+    con solo las columnas que se consultan: las categóricas como sus códigos
+    y los conceptos normalizados como tabla aparte, así la búsqueda sin
+    tildes (`contains` sobre los conceptos ya normalizados) recorre
+    conceptos distintos y no movimientos.
+
+    `filtros` es siempre la tupla `(start_date, end_date, razon, excluir, mes, año)`
+    con los valores de la barra de filtros.
+    """
+
+    def __init__(self, df, hilos=None):
+        if duckdb is None:
+            raise ImportError("DuckDB no está instalado (pip install duckdb)")
+        self.df = df
+        self._conexion = duckdb.connect()
+        if hilos:
+            self._conexion.execute(f"SET threads = {int(hilos)}")
+        categorias = df["ConceptoNormalizado"].cat.categories
+        tablas = {
+            "libro": pa.table({
+                "fila": np.arange(len(df), dtype=np.int64),
+                "fecha": df["Fecha"].to_numpy(),
+                "centavos": df["Centavos"].to_numpy(),
+                "concepto": df["Concepto"].cat.codes.to_numpy(),
+                "normalizado": df["ConceptoNormalizado"].cat.codes.to_numpy(),
+                "agrupado": df["ConceptoAgrupado"].cat.codes.to_numpy(),
+            }),
+            "conceptos": pa.table({
+                "codigo": np.arange(len(categorias), dtype=np.int64),
+                "texto": pa.array(categorias.astype(str).tolist(), pa.string()),
+            }),
+        }
+        # Tablas propias de DuckDB (no vistas sobre Arrow): son más rápidas de
+        # recorrer, guardan mínimos y máximos por bloque (el libro viene
+        # ordenado por fecha) y las ven todos los cursores
+        for nombre, tabla in tablas.items():
+            self._conexion.register(f"{nombre}_arrow", tabla)
+            self._conexion.execute(f"CREATE TABLE {nombre} AS SELECT * FROM {nombre}_arrow")
+            self._conexion.unregister(f"{nombre}_arrow")
+
+    def _consultar(self, sql, parametros):
+        # Un cursor por consulta: cada sesión de Streamlit corre en su propio hilo
+        with self._conexion.cursor() as cursor:
+            return cursor.execute(sql, parametros).fetchnumpy()
+
+    def _condiciones(self, filtros):
+        """Cláusula WHERE y parámetros equivalentes a `filtrar_datos`"""
+        start_date, end_date, razon, excluir, mes, año = filtros
+        condiciones, parametros = ["TRUE"], []
+        if año != "Todos":
+            condiciones.append("year(fecha) = ?")
+            parametros.append(int(año))
+        if mes != "Todos":
+            condiciones.append("month(fecha) = ?")
+            parametros.append(NUMERO_MES[mes])
+        if start_date:
+            condiciones.append("fecha >= ?")
+            parametros.append(pd.Timestamp(start_date).to_pydatetime())
+        if end_date:
+            condiciones.append("fecha <= ?")
+            parametros.append(pd.Timestamp(end_date).to_pydatetime())
+        if razon:
+            condiciones.append("normalizado IN (SELECT codigo FROM conceptos WHERE contains(texto, ?))")
+            parametros.append(normalizar_texto(razon))
+        palabras_excluir = separar_palabras(excluir) if excluir else []
+        if palabras_excluir:
+            condiciones.append(
+                "normalizado NOT IN (SELECT codigo FROM conceptos WHERE "
+                + " OR ".join(["contains(texto, ?)"] * len(palabras_excluir)) + ")"
+            )
+            parametros.extend(normalizar_texto(palabra) for palabra in palabras_excluir)
+        return " AND ".join(condiciones), parametros
+
+    # --------------------------
+    # Equivalentes de las funciones de pandas
+    # --------------------------
+    def filtrar_datos(self, filtros):
+        """Como `filtrar_datos`: las filas del libro que pasan los filtros, en su orden"""
+        donde, parametros = self._condiciones(filtros)
+        filas = self._consultar(f"SELECT fila FROM libro WHERE {donde} ORDER BY fila", parametros)["fila"]
+        return self.df.iloc[filas]
+
+    def resumir_movimientos(self, filtros, n=10):
+        """Como `resumir_movimientos` sobre el libro filtrado"""
+        donde, parametros = self._condiciones(filtros)
+        totales = self._consultar(
+            f"""SELECT
+                    coalesce(sum(centavos) FILTER (WHERE centavos >= 0), 0)::BIGINT AS ingresos,
+                    coalesce(sum(centavos) FILTER (WHERE centavos < 0), 0)::BIGINT AS gastos
+                FROM libro WHERE {donde}""",
+            parametros,
+        )
+        # Una fila por categoría, en el orden del groupby de pandas; el orden
+        # final se hace igual que en pandas para que los empates coincidan
+        por_categoria = self._consultar(
+            f"""SELECT agrupado, sum(centavos)::BIGINT AS centavos
+                FROM libro WHERE {donde} AND centavos < 0 AND agrupado >= 0
+                GROUP BY agrupado ORDER BY agrupado""",
+            parametros,
+        )
+        top_gastos = pd.DataFrame({
+            "ConceptoAgrupado": pd.Categorical.from_codes(
+                por_categoria["agrupado"].astype(np.int64), dtype=self.df["ConceptoAgrupado"].dtype
+            ),
+            "Centavos": por_categoria["centavos"].astype(np.int64),
+        }).sort_values(by="Centavos").head(n)
+        top_gastos["Cantidad"] = top_gastos["Centavos"].abs() / 100
+        return int(totales["ingresos"][0]), int(totales["gastos"][0]), top_gastos
+
+    def desglose_por_concepto(self, df_final, categoria, filtros):
+        """Como `desglose_por_concepto`; `df_final` es el libro filtrado con los mismos `filtros`"""
+        donde, parametros = self._condiciones(filtros)
+        codigo = self.df["ConceptoAgrupado"].cat.categories.get_loc(categoria)
+        filas = self._consultar(
+            f"SELECT fila FROM libro WHERE {donde} AND centavos < 0 AND agrupado = ? ORDER BY fila",
+            parametros + [codigo],
+        )["fila"]
+        # df_final conserva el índice (único) y el orden del libro
+        desglose = df_final.iloc[df_final.index.get_indexer(self.df.index[filas])]
+        desglose["Cantidad"] = desglose["Cantidad"].abs()
+
+        agrupado = self._consultar(
+            f"""SELECT concepto, abs(sum(centavos))::BIGINT AS centavos, count(*) AS veces
+                FROM libro WHERE {donde} AND centavos < 0 AND agrupado = ? AND concepto >= 0
+                GROUP BY concepto ORDER BY concepto""",
+            parametros + [codigo],
+        )
+        desglose_agrupado = pd.DataFrame({
+            "Concepto": pd.Categorical.from_codes(agrupado["concepto"].astype(np.int64), dtype=self.df["Concepto"].dtype),
+            "Cantidad": agrupado["centavos"].astype(np.int64) / 100,
+            "Número de veces": agrupado["veces"].astype(np.int64),
+        })
+        return desglose, desglose_agrupado.sort_values("Cantidad", ascending=False)
@@ -0,0 +1,28 @@
+import numpy as np
+
+
+# --------------------------
+# SUBMUESTREO PARA GRÁFICOS
+# --------------------------
+def indices_min_max(valores, cubetas):
+    """Posiciones a conservar para dibujar `valores` con a lo sumo `2 * cubetas + 2` puntos.
+
+    Divide la serie en `cubetas` tramos contiguos y conserva en cada uno su
+    mínimo y su máximo, además del primer y el último punto. Así los picos y
+    valles se ven igual que con la serie completa. Las posiciones se devuelven
+    ordenadas; si la serie ya es corta se devuelven todas.
+    """
+    valores = np.asarray(valores)
+    n = len(valores)
+    if n <= 2 * cubetas + 2:
+        return np.arange(n)
+
+    inicios = np.arange(cubetas) * n // cubetas
+    cubeta = np.repeat(np.arange(cubetas), np.diff(np.r_[inicios, n]))
+    posiciones = [0, n - 1]
+    for extremo in (np.minimum.reduceat(valores, inicios), np.maximum.reduceat(valores, inicios)):
+        # Primera posición de cada tramo donde se alcanza su extremo
+        coincide = np.flatnonzero(valores == extremo[cubeta])
+        _, primeras = np.unique(cubeta[coincide], return_index=True)
+        posiciones.append(coincide[primeras])
+    return np.unique(np.concatenate([np.atleast_1d(p) for p in posiciones]))
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+
+# --------------------------
+# PAGINACIÓN CON ORDEN EN EL SERVIDOR
+# --------------------------
+def claves_orden(serie):
+    """Valores que ordenan `serie` como se ve en pantalla (las categóricas por su texto)"""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        categorias = serie.cat.categories
+        rango = np.empty(len(categorias), dtype=np.int64)
+        rango[np.argsort(categorias.astype(str).to_numpy(), kind="stable")] = np.arange(len(categorias))
+        codigos = serie.cat.codes.to_numpy()
+        # Los vacíos (código -1) van al principio
+        return np.where(codigos >= 0, rango[codigos], -1)
+    return serie.to_numpy()
+
+
+class Paginador:
+    """Páginas de un DataFrame ordenado por cualquiera de sus columnas.
+
+    El orden de cada columna y sentido se calcula una vez (permutación de
+    posiciones) y cada página toma solo sus filas, así que pasar de página
+    cuesta O(tamaño de página). Si el DataFrame ya viene ordenado por
+    `ordenado_por` esa columna no necesita permutación.
+    """
+
+    def __init__(self, df, ordenado_por=None):
+        self.df = df
+        self.ordenado_por = ordenado_por
+        self._permutaciones = {}
+
+    def total_paginas(self, tamaño):
+        return max(1, -(-len(self.df) // tamaño))
+
+    def _permutacion(self, columna, ascendente):
+        clave = (columna, ascendente)
+        if clave not in self._permutaciones:
+            orden = np.argsort(claves_orden(self.df[columna]), kind="stable")
+            self._permutaciones[clave] = orden if ascendente else orden[::-1]
+        return self._permutaciones[clave]
+
+    def pagina(self, numero, tamaño, columna=None, ascendente=True):
+        """Filas de la página `numero` (desde 1) con `tamaño` filas por página"""
+        total = len(self.df)
+        inicio = min((numero - 1) * tamaño, total)
+        fin = min(inicio + tamaño, total)
+        if columna is None or columna == self.ordenado_por:
+            if ascendente:
+                return self.df.iloc[inicio:fin]
+            return self.df.iloc[total - fin:total - inicio].iloc[::-1]
+        return self.df.iloc[self._permutacion(columna, ascendente)[inicio:fin]]
@@ -0,0 +1,88 @@
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+# --------------------------
+# NORMALIZACIÓN DE TEXTO (sin tildes)
+# --------------------------
+def normalizar_texto(texto):
+    """Elimina tildes y convierte a minúsculas"""
+    if pd.isna(texto):
+        return ""
+    texto = str(texto).lower()
+    # Normaliza y elimina tildes
+    texto = unicodedata.normalize('NFD', texto)
+    texto = ''.join(char for char in texto if unicodedata.category(char) != 'Mn')
+    return texto
+
+
+def normalizar_columna(serie):
+    """Normaliza una columna de texto trabajando solo sobre sus valores únicos.
+
+    Devuelve una columna categórica cuyas categorías son los textos
+    normalizados; las celdas vacías quedan como "".
+    """
+    codigos, unicos = pd.factorize(serie)
+    normalizados = [normalizar_texto(valor) for valor in unicos] + [""]
+    # Categorías `str`, como las demás categóricas de texto: las de tipo object
+    # vuelven como `str` de una instantánea y ya no se pueden unir con ellas
+    codigos_normalizados, categorias = pd.factorize(pd.Series(normalizados, dtype=str))
+    # El código -1 (celda vacía) apunta al "" agregado al final
+    return pd.Series(
+        pd.Categorical.from_codes(codigos_normalizados[codigos], categories=categorias),
+        index=serie.index,
+    )
+
+
+# --------------------------
+# ÍNDICE DE TRIGRAMAS PARA BÚSQUEDA POR SUBCADENA
+# --------------------------
+class IndiceTrigramas:
+    """Índice invertido trigrama -> textos que lo contienen.
+
+    Se construye sobre las categorías de la columna normalizada, así una
+    búsqueda solo verifica los textos candidatos en lugar de recorrer todas
+    las filas.
+    """
+
+    def __init__(self, textos):
+        self.textos = list(textos)
+        posiciones = defaultdict(list)
+        for i, texto in enumerate(self.textos):
+            for trigrama in {texto[j:j + 3] for j in range(len(texto) - 2)}:
+                posiciones[trigrama].append(i)
+        self._posiciones = {
+            trigrama: np.array(ids, dtype=np.int64) for trigrama, ids in posiciones.items()
+        }
+
+    def buscar(self, consulta):
+        """Índices de los textos que contienen `consulta` como subcadena"""
+        if len(consulta) < 3:
+            return np.array([i for i, texto in enumerate(self.textos) if consulta in texto], dtype=np.int64)
+
+        trigramas = {consulta[j:j + 3] for j in range(len(consulta) - 2)}
+        vacia = np.array([], dtype=np.int64)
+        listas = sorted((self._posiciones.get(t, vacia) for t in trigramas), key=len)
+        candidatos = listas[0]
+        for lista in listas[1:]:
+            if not len(candidatos):
+                break
+            candidatos = np.intersect1d(candidatos, lista, assume_unique=True)
+        # Los trigramas no garantizan el orden: se verifica la subcadena completa
+        return np.array([i for i in candidatos if consulta in self.textos[i]], dtype=np.int64)
+
+
+def mascara_contiene(conceptos, consultas, indice=None):
+    """Máscara de filas cuyo concepto normalizado contiene alguna consulta.
+
+    `conceptos` es la columna categórica de `normalizar_columna` y `consultas`
+    textos ya normalizados. Si no se pasa `indice` se recorren las categorías.
+    """
+    if indice is None:
+        categorias = conceptos.cat.categories
+        ids = [i for i, texto in enumerate(categorias) if any(c in texto for c in consultas)]
+    else:
+        ids = np.unique(np.concatenate([indice.buscar(c) for c in consultas]))
+    return conceptos.cat.codes.isin(ids)